@@ -0,0 +1,272 @@
+"""Relatórios de avaliação por colaborador gerados em lote, sem a interface do Streamlit.
+
+Lê os snapshots locais das abas (funciona offline), reaproveita o processamento,
+os filtros e as categorias do dashboard e gera:
+
+- um arquivo HTML por colaborador e aba, com as médias e os gráficos das categorias
+  (o plotly.min.js é gravado uma vez no diretório de saída e referenciado pelas páginas);
+- uma planilha Excel com o resumo de todos os colaboradores.
+
+Os colaboradores são processados em paralelo em um pool de processos.
+
+Uso:
+    python batch_report.py --mes 2025-05
+    python batch_report.py --inicio 2025-01-01 --fim 2025-06-30 --abas PRODUÇÃO COMERCIAL
+"""
+
+import argparse
+import html
+import logging
+import os
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from dashboard import (
+    CATEGORY_QUESTIONS,
+    QUESTIONS,
+    SHEET_NAMES,
+    SNAPSHOT_DIR,
+    ProcessedSheet,
+    categories_for,
+    category_bar_spec,
+    compute_statistics,
+    process_dataframe,
+    read_snapshot,
+)
+
+logger = logging.getLogger("batch_report")
+
+# Biblioteca do Plotly compartilhada pelas páginas (no diretório de saída)
+PLOTLY_JS = "plotly.min.js"
+
+# Abas processadas de cada processo do pool (carregadas uma vez por processo)
+_sheets = {}
+
+def slugify(text):
+    """Nome de arquivo seguro a partir de um texto (sem acentos nem espaços)"""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode().lower()
+    return "-".join("".join(c if c.isalnum() else " " for c in text).split()) or "sem-nome"
+
+def report_file_names(colaboradores):
+    """Nome do arquivo HTML de cada colaborador; nomes que viram o mesmo slug
+    ganham um sufixo (-2, -3...) em vez de sobrescrever o relatório"""
+    names = {}
+    used = set()
+    for colaborador in colaboradores:
+        base = slugify(colaborador)
+        name, suffix = base, 1
+        while name in used:
+            suffix += 1
+            name = f"{base}-{suffix}"
+        if name != base:
+            logger.warning("Colaborador %r gravado como %s.html (nome repetido após slugify)", colaborador, name)
+        used.add(name)
+        names[colaborador] = name
+    return names
+
+def write_plotly_js(output_dir):
+    """Grava o plotly.min.js uma única vez no diretório de saída"""
+    path = Path(output_dir) / PLOTLY_JS
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(get_plotlyjs(), encoding="utf-8")
+
+def load_snapshot_sheet(sheet_name, directory):
+    """Lê e processa o snapshot de uma aba; retorna None se não existir"""
+    snapshot = read_snapshot(sheet_name, directory)
+    if snapshot is None:
+        return None
+    df, meta = snapshot
+    return ProcessedSheet(sheet_name, meta.get("row_count"), process_dataframe(df))
+
+def init_worker(sheet_names, directory):
+    """Inicializador do pool: cada processo lê os snapshots uma única vez"""
+    for sheet_name in sheet_names:
+        sheet = load_snapshot_sheet(sheet_name, directory)
+        if sheet is not None:
+            _sheets[sheet_name] = sheet
+
+@lru_cache(maxsize=None)
+def plotly_template():
+    """Tema padrão do Plotly como dicionário (aplicado pelo go.Figure no dashboard)"""
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+def chart_html(spec):
+    """HTML do gráfico a partir da especificação em dicionário, sem a validação do go.Figure"""
+    spec["layout"]["template"] = plotly_template()
+    return pio.to_html(spec, validate=False, include_plotlyjs=False, full_html=False)
+
+def format_mean(value):
+    return "-" if np.isnan(value) else f"{value:.2f}"
+
+def render_html(sheet_name, colaborador, period, stats, plotly_js=f"../{PLOTLY_JS}"):
+    """Página HTML estática com as médias e o gráfico de cada categoria.
+    
+    `plotly_js` é o caminho do plotly.min.js relativo à página (as páginas
+    ficam em um subdiretório por aba).
+    """
+    start_date, end_date = period
+    period_text = (
+        f"{start_date:%d/%m/%Y} a {end_date:%d/%m/%Y}" if start_date and end_date else "Todo o período"
+    )
+
+    parts = [
+        "<!DOCTYPE html>",
+        '<html lang="pt-BR"><head><meta charset="utf-8">',
+        f"<title>Avaliação - {html.escape(colaborador)}</title>",
+        f'<script src="{html.escape(plotly_js)}"></script>',
+        "<style>body{font-family:sans-serif;margin:2rem;color:#2c3e50}"
+        "table{border-collapse:collapse;margin-bottom:1.5rem}"
+        "th,td{border:1px solid #ddd;padding:.4rem .8rem;text-align:left}"
+        "th{background:#f5f5f5}td.num{text-align:right}</style>",
+        "</head><body>",
+        f"<h1>{html.escape(colaborador)}</h1>",
+        f"<p><b>Setor:</b> {html.escape(sheet_name)} &nbsp; <b>Período:</b> {period_text}"
+        f" &nbsp; <b>Avaliações:</b> {stats.rows} &nbsp; <b>Média geral:</b> {format_mean(stats.overall_mean)}</p>",
+    ]
+
+    for category in stats.categories:
+        parts.append(f"<h2>{html.escape(category.name)} — média {format_mean(category.mean)}</h2>")
+        parts.append("<table><tr><th>Pergunta</th><th>Respostas</th><th>Média</th></tr>")
+        for question in category.questions:
+            parts.append(
+                f"<tr><td>{html.escape(QUESTIONS[question.question].label)}</td>"
+                f'<td class="num">{question.count}</td><td class="num">{format_mean(question.mean)}</td></tr>'
+            )
+        parts.append("</table>")
+
+        spec = category_bar_spec(category)
+        if spec:
+            parts.append(chart_html(spec))
+
+    parts.append(f"<p><small>Gerado em {datetime.now():%d/%m/%Y %H:%M}</small></p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+def collaborator_report(task):
+    """Gera o HTML de um colaborador e devolve as linhas do resumo para o Excel"""
+    sheet_name, colaborador, file_name, start_date, end_date, output_dir = task
+    sheet = _sheets[sheet_name]
+
+    # Histogramas da aba: montados na primeira tarefa e reaproveitados pelo processo
+    selection = sheet.histograms.select(start_date, end_date, colaborador)
+    stats = compute_statistics(selection, categories_for(sheet_name))
+
+    html_path = Path(output_dir) / slugify(sheet_name) / f"{file_name}.html"
+    html_path.parent.mkdir(parents=True, exist_ok=True)
+    html_path.write_text(render_html(sheet_name, colaborador, (start_date, end_date), stats), encoding="utf-8")
+
+    summary = {"Setor": sheet_name, "Colaborador": colaborador, "Avaliações": stats.rows}
+    questions = []
+    for category in stats.categories:
+        summary[category.name] = category.mean
+        for question in category.questions:
+            questions.append({
+                "Setor": sheet_name,
+                "Colaborador": colaborador,
+                "Categoria": category.name,
+                "ID": question.question,
+                "Pergunta": QUESTIONS[question.question].text.strip(),
+                "Respostas": question.count,
+                "Média": question.mean,
+            })
+    summary["Média geral"] = stats.overall_mean
+    return summary, questions
+
+def collaborators_in_period(sheet, start_date, end_date):
+    """Colaboradores com pelo menos uma avaliação no período"""
+    index = sheet.index
+    if not (start_date and end_date) or 'Data' not in sheet.df.columns:
+        return list(index.colaboradores)
+
+    lo, hi = index.date_range(start_date, end_date)
+    return [
+        colaborador for colaborador, positions in index.positions.items()
+        if np.searchsorted(positions, lo) < np.searchsorted(positions, hi)
+    ]
+
+def write_excel(path, summaries, questions):
+    """Planilha com o resumo por colaborador e o detalhe por pergunta"""
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        columns = ["Setor", "Colaborador", "Avaliações", *CATEGORY_QUESTIONS, "Média geral"]
+        pd.DataFrame(summaries, columns=columns).to_excel(writer, sheet_name="Resumo", index=False)
+        pd.DataFrame(questions).to_excel(writer, sheet_name="Perguntas", index=False)
+
+def parse_period(args):
+    """Período do relatório: --mes AAAA-MM ou --inicio/--fim (padrão: todos os dados)"""
+    if args.mes:
+        start_date = datetime.strptime(args.mes, "%Y-%m").date()
+        end_date = (pd.Timestamp(start_date) + pd.offsets.MonthEnd(0)).date()
+        return start_date, end_date
+    if args.inicio or args.fim:
+        start_date = date.fromisoformat(args.inicio) if args.inicio else date.min
+        end_date = date.fromisoformat(args.fim) if args.fim else date.max
+        return start_date, end_date
+    return None, None
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Gera os relatórios de avaliação de todos os colaboradores")
+    parser.add_argument("--mes", help="mês do relatório (AAAA-MM)")
+    parser.add_argument("--inicio", help="data inicial (AAAA-MM-DD)")
+    parser.add_argument("--fim", help="data final (AAAA-MM-DD)")
+    parser.add_argument("--abas", nargs="+", default=SHEET_NAMES, help="abas incluídas (padrão: todas)")
+    parser.add_argument("--snapshots", default=SNAPSHOT_DIR, type=Path, help="diretório dos snapshots locais")
+    parser.add_argument("--saida", default=Path("relatorios"), type=Path, help="diretório de saída")
+    parser.add_argument("--processos", type=int, default=os.cpu_count(), help="tamanho do pool de processos")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Linhas JSON das etapas do dashboard só com DASHBOARD_LOG_LEVEL=INFO
+    logging.getLogger("dashboard").setLevel(os.environ.get("DASHBOARD_LOG_LEVEL", "WARNING").upper())
+    start_date, end_date = parse_period(args)
+    started = time.perf_counter()
+
+    # O processo principal só precisa da lista de colaboradores de cada aba
+    init_worker(args.abas, args.snapshots)
+    tasks = []
+    for sheet_name in args.abas:
+        sheet = _sheets.get(sheet_name)
+        if sheet is None:
+            logger.warning("Snapshot da aba %s não encontrado em %s", sheet_name, args.snapshots)
+            continue
+        file_names = report_file_names(collaborators_in_period(sheet, start_date, end_date))
+        for colaborador, file_name in file_names.items():
+            tasks.append((sheet_name, colaborador, file_name, start_date, end_date, args.saida))
+
+    if not tasks:
+        logger.warning("Nenhuma avaliação encontrada para o período")
+        return 1
+
+    write_plotly_js(args.saida)
+    sheet_names = sorted({task[0] for task in tasks})
+    summaries, questions = [], []
+    with ProcessPoolExecutor(
+        max_workers=args.processos, initializer=init_worker, initargs=(sheet_names, args.snapshots)
+    ) as executor:
+        chunksize = max(1, len(tasks) // (4 * (args.processos or 1)))
+        for summary, question_rows in executor.map(collaborator_report, tasks, chunksize=chunksize):
+            summaries.append(summary)
+            questions.extend(question_rows)
+
+    args.saida.mkdir(parents=True, exist_ok=True)
+    excel_path = args.saida / "resumo.xlsx"
+    write_excel(excel_path, summaries, questions)
+
+    logger.info(
+        "%d relatórios gerados em %.1f s (HTML em %s, resumo em %s)",
+        len(summaries), time.perf_counter() - started, args.saida, excel_path,
+    )
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
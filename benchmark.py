@@ -0,0 +1,267 @@
+"""Benchmark do processamento do dashboard com dados sintéticos do Google Forms.
+
+Gera abas com o mesmo layout das quatro abas reais (colunas tiradas das listas
+de perguntas do dashboard), com valores "sujos" como os do formulário: células
+vazias, textos, vírgula decimal, notas fora da escala e datas inválidas.
+
+Para cada tamanho e aba mede o tempo (melhor de N repetições) e o pico de
+memória (tracemalloc) das etapas:
+
+- process_dataframe
+- montagem do índice e dos histogramas da aba (uma vez por versão no dashboard)
+- filter_dataframe (sem e com o índice da aba)
+- estatísticas por categoria (histogramas + compute_statistics), para um
+  colaborador em um período e para a visão inicial ("Todos", período completo)
+- create_pie_chart
+
+Antes de medir, confere que as datas sintéticas foram convertidas (pelo menos
+MIN_DATE_PARSE_RATE das linhas): com datas perdidas, as etapas por período
+rodariam sobre uma fração das linhas sem ninguém perceber.
+
+Os resultados são comparados com o baseline salvo em benchmark_baseline.json;
+a execução falha (código 1) se alguma etapa ficar mais lenta ou usar mais
+memória do que o baseline além da tolerância.
+
+Uso:
+    python benchmark.py                      # 1k, 10k e 100k linhas, compara com o baseline
+    python benchmark.py --linhas 1000000     # inclui 1M de linhas
+    python benchmark.py --salvar-baseline    # grava os resultados como novo baseline
+    python benchmark.py --exportar dados/ --linhas 100000
+        # grava as abas sintéticas em Parquet para rodar o dashboard offline com
+        # DASHBOARD_DATA_SOURCE=arquivos (ou memoria) e DASHBOARD_DATA_PATH=dados/
+"""
+
+import argparse
+import gc
+import json
+import logging
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dashboard import (
+    ASPECTOS_PESSOAIS,
+    CLIMA_ORGANIZACIONAL,
+    DESEMPENHO_PROFISSIONAL,
+    DESENVOLVIMENTO,
+    SHEET_NAMES,
+    ProcessedSheet,
+    ScoreHistograms,
+    SheetIndex,
+    categories_for,
+    compute_statistics,
+    create_pie_chart,
+    filter_dataframe,
+    process_dataframe,
+    sheet_slug,
+)
+
+BASELINE_PATH = Path(__file__).with_name("benchmark_baseline.json")
+DEFAULT_ROWS = [1_000, 10_000, 100_000]
+
+# Valores inválidos que aparecem nas respostas reais
+JUNK_SCORES = ["", "", "", "N/A", "-", "dez", "7,5", " 8 ", "0", "11", "100"]
+JUNK_DATES = ["", "sem data", "31/02/2025 10:00:00"]
+
+# Fração mínima de datas convertidas por process_dataframe (as inválidas são ~1%)
+MIN_DATE_PARSE_RATE = 0.95
+
+def sheet_questions(sheet_name):
+    """Perguntas do formulário de cada aba"""
+    if sheet_name == "CLIMA":
+        return CLIMA_ORGANIZACIONAL
+    return ASPECTOS_PESSOAIS + DESENVOLVIMENTO + DESEMPENHO_PROFISSIONAL
+
+def generate_sheet(sheet_name, n_rows, seed=0, junk_rate=0.05):
+    """Aba sintética como a grade crua lida da planilha (todas as células em texto)"""
+    rng = np.random.default_rng(seed)
+    n_colaboradores = max(10, n_rows // 50)
+
+    base = np.datetime64("2024-01-01T00:00:00")
+    offsets = rng.integers(0, 2 * 365 * 24 * 3600, n_rows).astype("timedelta64[s]")
+    timestamps = pd.Series(base + offsets).dt.strftime("%d/%m/%Y %H:%M:%S").to_numpy(dtype=object)
+    junk = rng.random(n_rows) < junk_rate / 5
+    timestamps[junk] = rng.choice(JUNK_DATES, junk.sum())
+
+    data = {
+        "Carimbo de data/hora": timestamps,
+        "AVALIADOR": rng.choice([f"Avaliador {i}" for i in range(1, 21)], n_rows),
+        "COLABORADOR": rng.choice([f"Colaborador {i}" for i in range(1, n_colaboradores + 1)], n_rows),
+        "SETOR": np.full(n_rows, sheet_name, dtype=object),
+    }
+
+    # Notas concentradas na parte alta da escala, como nas avaliações reais
+    score_text = np.array([str(k) for k in range(1, 11)], dtype=object)
+    weights = np.array([1, 1, 2, 3, 5, 8, 12, 16, 14, 10], dtype=np.float64)
+    for question in sheet_questions(sheet_name):
+        scores = score_text[rng.choice(10, n_rows, p=weights / weights.sum())]
+        junk = rng.random(n_rows) < junk_rate
+        scores[junk] = rng.choice(JUNK_SCORES, junk.sum())
+        data[question] = scores
+
+    data["OBSERVAÇÕES"] = rng.choice(["", "", "", "Bom desempenho", "Precisa melhorar a pontualidade"], n_rows)
+    return pd.DataFrame(data)
+
+def export_sheets(directory, n_rows, sheet_names):
+    """Grava as abas sintéticas em Parquet, no formato lido pela FileSource"""
+    directory.mkdir(parents=True, exist_ok=True)
+    for sheet_name in sheet_names:
+        raw = generate_sheet(sheet_name, n_rows, seed=SHEET_NAMES.index(sheet_name))
+        raw.to_parquet(directory / f"{sheet_slug(sheet_name)}.parquet", index=False)
+        print(f"{sheet_name}: {n_rows} linhas em {directory}")
+
+def best_time(func, repeats):
+    """Menor tempo de parede entre as repetições (segundos)"""
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def peak_memory(func):
+    """Pico de memória alocada durante a chamada (bytes)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark_sheet(sheet_name, n_rows, repeats):
+    """Tempo e memória de cada etapa para uma aba sintética"""
+    raw = generate_sheet(sheet_name, n_rows, seed=SHEET_NAMES.index(sheet_name))
+    sheet = ProcessedSheet(sheet_name, 0, process_dataframe(raw))
+    df = sheet.df
+    categories = categories_for(sheet_name)
+
+    parse_rate = df["Data"].notna().mean()
+    if parse_rate < MIN_DATE_PARSE_RATE:
+        raise SystemExit(
+            f"{sheet_name}/{n_rows}: só {parse_rate:.0%} das datas foram convertidas"
+            f" (mínimo {MIN_DATE_PARSE_RATE:.0%})"
+        )
+
+    # Período do meio dos dados e o colaborador mais frequente
+    dates = df["Data"].dropna().sort_values()
+    start_date, end_date = dates.iloc[len(dates) // 4], dates.iloc[3 * len(dates) // 4]
+    colaborador = df["COLABORADOR"].value_counts().index[0]
+    first_question = next(col for col in df.columns if col in sheet.histograms.questions)
+    # Índice e histogramas da versão, usados pelas etapas de consulta (a montagem é medida à parte)
+    index, histograms = sheet.index, sheet.histograms
+
+    def statistics():
+        filtered_df = filter_dataframe(df, start_date, end_date, colaborador)
+        return compute_statistics(ScoreHistograms(filtered_df).select(), categories)
+
+    stages = {
+        "process_dataframe": lambda: process_dataframe(raw),
+        "indice_histogramas": lambda: ScoreHistograms(df, SheetIndex(df)),
+        "filter_dataframe": lambda: filter_dataframe(df, start_date, end_date, colaborador),
+        "filter_dataframe_indexado": lambda: filter_dataframe(df, start_date, end_date, colaborador, index),
+        "estatisticas": statistics,
+        "estatisticas_histogramas": lambda: compute_statistics(
+            histograms.select(start_date, end_date, colaborador), categories
+        ),
+        "estatisticas_todos": lambda: compute_statistics(histograms.select(), categories),
+        "create_pie_chart": lambda: create_pie_chart(df[first_question], "Pergunta", "Pergunta"),
+    }
+
+    results = {}
+    for stage, func in stages.items():
+        results[stage] = {
+            "segundos": best_time(func, repeats),
+            "pico_bytes": peak_memory(func),
+        }
+    return results
+
+def run(row_counts, sheet_names, repeats):
+    results = {}
+    for n_rows in row_counts:
+        for sheet_name in sheet_names:
+            key = f"{sheet_name}/{n_rows}"
+            results[key] = benchmark_sheet(sheet_name, n_rows, repeats)
+            for stage, result in results[key].items():
+                print(
+                    f"{key:<22} {stage:<28} {result['segundos'] * 1000:>10.2f} ms"
+                    f" {result['pico_bytes'] / 2**20:>10.2f} MiB"
+                )
+    return results
+
+def compare(results, baseline, tolerance, min_seconds=0.005):
+    """Etapas mais lentas ou mais pesadas que o baseline além da tolerância.
+
+    Etapas abaixo de `min_seconds` no baseline não são comparadas por tempo:
+    nessa escala a variação do relógio é maior que a tolerância.
+    """
+    regressions = []
+    for key, stages in results.items():
+        for stage, result in stages.items():
+            reference = baseline.get(key, {}).get(stage)
+            if reference is None:
+                continue
+            if reference["segundos"] >= min_seconds and result["segundos"] > reference["segundos"] * (1 + tolerance):
+                regressions.append(
+                    f"{key} {stage}: {result['segundos'] * 1000:.2f} ms (baseline {reference['segundos'] * 1000:.2f} ms)"
+                )
+            if result["pico_bytes"] > reference["pico_bytes"] * (1 + tolerance):
+                regressions.append(
+                    f"{key} {stage}: {result['pico_bytes'] / 2**20:.2f} MiB"
+                    f" (baseline {reference['pico_bytes'] / 2**20:.2f} MiB)"
+                )
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark do processamento do dashboard")
+    parser.add_argument("--linhas", nargs="+", type=int, default=DEFAULT_ROWS, help="tamanhos das abas sintéticas")
+    parser.add_argument("--abas", nargs="+", default=SHEET_NAMES, help="abas geradas (padrão: todas)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="repetições por etapa (vale a menor)")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="aumento aceito sobre o baseline (0.5 = 50%%)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="arquivo do baseline")
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava os resultados como novo baseline")
+    parser.add_argument("--exportar", type=Path, help="só grava as abas sintéticas (Parquet) nesta pasta")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Avisos do Streamlit fora de uma sessão e de datas inválidas não interessam aqui
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+
+    if args.exportar:
+        export_sheets(args.exportar, max(args.linhas), args.abas)
+        return 0
+
+    results = run(args.linhas, args.abas, args.repeticoes)
+
+    if args.salvar_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Baseline gravado em {args.baseline} ({datetime.now():%d/%m/%Y %H:%M})")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"Sem baseline em {args.baseline}: rode com --salvar-baseline para criar")
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerancia)
+    if regressions:
+        print("\nRegressões em relação ao baseline:")
+        for regression in regressions:
+            print(f"- {regression}")
+        return 1
+
+    print("\nSem regressões em relação ao baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
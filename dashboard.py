@@ -2,241 +2,876 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from datetime import datetime, date
+from pathlib import Path
+from bisect import bisect_left
+import html
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future
+from contextlib import contextmanager
+from functools import wraps
+from typing import NamedTuple
 import gspread
+from gspread.utils import absolute_range_name, rowcol_to_a1
 from google.oauth2.service_account import Credentials
 import numpy as np
 
-# Configuração da página
-st.set_page_config(
-    page_title="Dashboard RH - Análise de Desempenho",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# CSS personalizado
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;500;600;700;800&display=swap');
-    
-    /* Aplicar Montserrat globalmente */
-    html, body, [class*="css"], h1, h2, h3, h4, h5, h6, p, div, span {
-        font-family: 'Montserrat', sans-serif !important;
-    }
+# Planilha de origem e abas disponíveis
+SPREADSHEET_ID = "1rwo4nu_DJNgUdb65UQ9e3AbiQacEHiRXA0hBbpvuULU"
+SHEET_NAMES = ["PRODUÇÃO", "ADMINISTRATIVO", "COMERCIAL", "CLIMA"]
+
+# Intervalo entre releituras completas (capturam edições em respostas antigas)
+FULL_SYNC_INTERVAL = 60 * 60  # 1 hora
+
+# Intervalo mínimo entre gravações do snapshot quando só chegam respostas novas
+SNAPSHOT_INTERVAL = 10 * 60  # 10 minutos
+
+# Diretório dos snapshots locais (contém dados de RH: não versionar)
+SNAPSHOT_DIR = Path(os.environ.get("DASHBOARD_SNAPSHOT_DIR", Path(__file__).with_name("snapshots")))
+
+# Nome fixo: executado pelo Streamlit, __name__ é "__main__"
+logger = logging.getLogger("dashboard")
+
+# Instrumentação: tempo de cada etapa, também exportado em linhas de log JSON
+STAGE_HISTORY = 200  # medições guardadas por etapa
+
+def log_event(event, **fields):
+    """Registra um evento estruturado (uma linha JSON) no log"""
+    logger.info(json.dumps({"evento": event, **fields}, ensure_ascii=False, default=str))
+
+def log_level_config():
+    """Nível do log do dashboard: DASHBOARD_LOG_LEVEL ou secrets [log] nivel (padrão INFO)"""
+    try:
+        config = dict(st.secrets.get("log", {}))
+    except Exception:
+        # Sem secrets.toml (execução local/testes)
+        config = {}
     
-    /* Personalizar sidebar */
-    .css-1d391kg {
-        background: linear-gradient(180deg, #96CA00 0%, #C5DF56 50%, #84A802 100%) !important;
-        padding: 1rem !important;
-    }
+    level = str(os.environ.get("DASHBOARD_LOG_LEVEL", config.get("nivel", "INFO"))).upper()
+    if not isinstance(logging.getLevelName(level), int):
+        raise ValueError(f"Nível de log desconhecido: {level}")
+    return level
+
+@st.cache_resource
+def setup_logging():
+    """Handler próprio do logger do dashboard, configurado uma vez por processo.
     
-    .css-1d391kg .stSelectbox label,
-    .css-1d391kg .stDateInput label,
-    .css-1d391kg h2,
-    .css-1d391kg h3 {
-        color: white !important;
-        font-weight: 600 !important;
-        font-family: 'Montserrat', sans-serif !important;
-    }
+    A raiz fica em WARNING no Streamlit; sem nível e handler próprios as linhas
+    JSON de log_event (INFO) seriam descartadas.
+    """
+    logger.setLevel(log_level_config())
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+    logger.propagate = False
+    return logger
+
+# Singletons do processo também usados pelos workers em segundo plano. Nessas
+# threads não há ScriptRunContext e cada chamada a um st.cache_resource registra
+# um aviso: os objetos são resolvidos na thread do script e entregues aos workers.
+WORKER_RESOURCES = []
+worker_context = threading.local()
+
+def process_resource(func):
+    """st.cache_resource que os workers em segundo plano também podem chamar.
     
-    .css-1d391kg .stButton button {
-        background: rgba(255, 255, 255, 0.2) !important;
-        color: white !important;
-        border: 2px solid white !important;
-        border-radius: 8px !important;
-        font-weight: 600 !important;
-        font-family: 'Montserrat', sans-serif !important;
-        transition: all 0.3s ease !important;
-    }
+    Em um worker (use_worker_resources) o objeto vem do dicionário resolvido
+    na thread do script por worker_resources().
+    """
+    cached = st.cache_resource(func)
     
-    .css-1d391kg .stButton button:hover {
-        background: white !important;
-        color: #96CA00 !important;
-    }
+    @wraps(func)
+    def getter():
+        resources = getattr(worker_context, "resources", None)
+        if resources is None:
+            return cached()
+        if func.__name__ not in resources:
+            # Não resolvido no script (ex.: sem conexão): tenta de novo e guarda
+            resources[func.__name__] = cached()
+        return resources[func.__name__]
     
-    .css-1d391kg .stMetric {
-        background: rgba(255, 255, 255, 0.15) !important;
-        padding: 1rem !important;
-        border-radius: 8px !important;
-        margin: 0.5rem 0 !important;
-    }
+    getter.clear = cached.clear
+    WORKER_RESOURCES.append(getter)
+    return getter
+
+def worker_resources():
+    """Resolve os singletons dos workers (chamar na thread do script)"""
+    resources = {}
+    for getter in WORKER_RESOURCES:
+        try:
+            resources[getter.__name__] = getter()
+        except Exception as e:
+            logger.warning("Recurso %s indisponível para os workers: %s", getter.__name__, e)
+    return resources
+
+def use_worker_resources(resources):
+    """Faz os getters da thread atual devolverem os objetos de `resources`"""
+    worker_context.resources = resources
+
+class StageTimings:
+    """Últimas medições de cada etapa, compartilhadas entre sessões e threads"""
     
-    .css-1d391kg .stMetric label,
-    .css-1d391kg .stMetric [data-testid="metric-container"] {
-        color: white !important;
-        font-family: 'Montserrat', sans-serif !important;
-        font-weight: 600 !important;
-    }
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # etapa -> tempos em segundos (últimas STAGE_HISTORY)
+        self.counts = {}
     
-    /* Logo na sidebar */
-    .sidebar-logo {
-        text-align: center;
-        margin: 1rem 0 2rem 0;
-        padding: 1rem;
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 10px;
-    }
+    def record(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, deque(maxlen=STAGE_HISTORY)).append(seconds)
+            self.counts[stage] = self.counts.get(stage, 0) + 1
     
-    .main-header {
-        background: linear-gradient(90deg, #96CA00 0%, #C5DF56 50%, #84A802 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-        text-align: center;
-        font-family: 'Montserrat', sans-serif;
-    }
+    def summary(self):
+        """Execuções, último tempo, média e p95 (ms) de cada etapa"""
+        with self.lock:
+            samples = {stage: np.array(values) * 1000 for stage, values in self.samples.items()}
+            counts = dict(self.counts)
+        return {
+            stage: {
+                "execuções": counts[stage],
+                "última (ms)": round(float(values[-1]), 2),
+                "média (ms)": round(float(values.mean()), 2),
+                "p95 (ms)": round(float(np.percentile(values, 95)), 2),
+            }
+            for stage, values in samples.items()
+        }
+
+@process_resource
+def get_stage_timings():
+    """Medições das etapas do processo (todas as sessões e o worker de atualização)"""
+    return StageTimings()
+
+@contextmanager
+def timed_stage(stage, **fields):
+    """Mede uma etapa do caminho crítico (carga, processamento, filtros, estatísticas, gráficos)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        get_stage_timings().record(stage, seconds)
+        log_event("etapa", etapa=stage, ms=round(seconds * 1000, 2), **fields)
+
+def open_spreadsheet():
+    """Autentica e abre a planilha (uma vez por processo, via get_data_source)"""
+    # Configurar credenciais do Google Sheets usando o arquivo JSON das secrets
+    scopes = [
+        "https://www.googleapis.com/auth/spreadsheets.readonly",
+        "https://www.googleapis.com/auth/drive.readonly"
+    ]
     
-    .main-header h1 {
-        color: white;
-        margin: 0;
-        font-weight: 700;
-        font-family: 'Montserrat', sans-serif;
-    }
+    # Carregando credenciais do secrets.toml
+    credentials = Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"], scopes=scopes
+    )
     
-    .section-header-producao {
-        background: linear-gradient(90deg, #4CAF50 0%, #8BC34A 100%);
-        color: white;
-        padding: 0.8rem;
-        border-radius: 8px;
-        margin: 1rem 0;
-        text-align: center;
-        font-weight: 600;
-        font-size: 1.8rem;
-        font-family: 'Montserrat', sans-serif;
-    }
+    client = gspread.authorize(credentials)
+    return client.open_by_key(SPREADSHEET_ID)
+
+def show_connection_error(e):
+    """Exibe o erro de conexão com a fonte de dados e as verificações sugeridas"""
+    try:
+        source_type = data_source_config()["tipo"]
+    except ValueError:
+        source_type = None
+    if source_type != "sheets":
+        st.error(f"❌ Erro ao ler a fonte de dados ({source_type or 'inválida'}): {str(e)}")
+        st.info("🔧 Verifique DASHBOARD_DATA_SOURCE/DASHBOARD_DATA_PATH ou a seção [fonte_dados] do secrets.toml")
+        return
     
-    .section-header-administrativo {
-        background: linear-gradient(90deg, #2196F3 0%, #64B5F6 100%);
-        color: white;
-        padding: 0.8rem;
-        border-radius: 8px;
-        margin: 1rem 0;
-        text-align: center;
-        font-weight: 600;
-        font-size: 1.8rem;
-        font-family: 'Montserrat', sans-serif;
-    }
+    st.error(f"❌ Erro ao conectar com Google Sheets: {str(e)}")
+    st.info("🔧 Verifique se:")
+    st.write("- As credenciais estão corretas no arquivo secrets.toml")
+    st.write("- A planilha foi compartilhada com o email da Service Account")
+    st.write("- As APIs do Google Sheets e Drive estão ativadas")
+
+def pad_row(row, width):
+    """Ajusta a linha à largura do cabeçalho (a API omite as células vazias no fim)"""
+    return row[:width] + [""] * (width - len(row))
+
+def build_dataframe(values):
+    """Monta o DataFrame a partir da grade de valores crua (cabeçalho na primeira linha)"""
+    if not values or len(values) < 2:
+        return pd.DataFrame()
     
-    .section-header-comercial {
-        background: linear-gradient(90deg, #FF9800 0%, #FFB74D 100%);
-        color: white;
-        padding: 0.8rem;
-        border-radius: 8px;
-        margin: 1rem 0;
-        text-align: center;
-        font-weight: 600;
-        font-size: 1.8rem;
-        font-family: 'Montserrat', sans-serif;
-    }
+    header = values[0]
+    width = len(header)
+    rows = [pad_row(row, width) for row in values[1:]]
+    return pd.DataFrame(rows, columns=header)
+
+# Snapshots locais em formato colunar (Parquet)
+def sheet_slug(sheet_name):
+    """Nome da aba sem acentos e em minúsculas, usado nos nomes de arquivo"""
+    return unicodedata.normalize("NFKD", sheet_name).encode("ascii", "ignore").decode().lower()
+
+def snapshot_paths(sheet_name, directory=None):
+    """Caminhos do arquivo de dados e do arquivo de metadados de uma aba"""
+    directory = Path(directory or SNAPSHOT_DIR)
+    slug = sheet_slug(sheet_name)
+    return directory / f"{slug}.parquet", directory / f"{slug}.json"
+
+def write_snapshot(sheet_name, data, header, last_full_sync, directory=None):
+    """Grava a cópia publicada `data` (SheetData) em disco junto com os metadados da leitura"""
+    data_path, meta_path = snapshot_paths(sheet_name, directory)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
     
-    .section-header-clima {
-        background: linear-gradient(90deg, #E91E63 0%, #F8BBD9 100%);
-        color: white;
-        padding: 0.8rem;
-        border-radius: 8px;
-        margin: 1rem 0;
-        text-align: center;
-        font-weight: 600;
-        font-size: 1.8rem;
-        font-family: 'Montserrat', sans-serif;
-    }
+    # Colunas posicionais: cabeçalhos do formulário podem se repetir ou vir vazios
+    df = data.df
+    columns = [f"c{i}" for i in range(len(df.columns))]
+    frame = pd.DataFrame(df.to_numpy(dtype=object), columns=columns).astype(str)
     
-    .category-header {
-        background: linear-gradient(90deg, #96CA00 0%, #C5DF56 100%);
-        color: white;
-        padding: 0.6rem;
-        border-radius: 6px;
-        margin: 0.8rem 0;
-        text-align: center;
-        font-weight: 600;
-        font-size: 1.4rem;
-        font-family: 'Montserrat', sans-serif;
+    meta = {
+        "sheet_name": sheet_name,
+        "header": header,
+        "row_count": len(df),
+        "fetched_at": data.fetched_at,
+        "last_full_sync": last_full_sync,
     }
     
-    .metric-card {
-        background: #f8f9fa;
-        padding: 1rem;
-        border-radius: 8px;
-        border: 1px solid #e9ecef;
-        text-align: center;
-        margin-left: auto;
-        margin-right: auto;
-        font-family: 'Montserrat', sans-serif;
-    }
+    # Escrita atômica: um arquivo parcial nunca substitui o snapshot anterior
+    tmp_data = data_path.with_suffix(".parquet.tmp")
+    tmp_meta = meta_path.with_suffix(".json.tmp")
+    frame.to_parquet(tmp_data, index=False)
+    tmp_meta.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_data, data_path)
+    os.replace(tmp_meta, meta_path)
+
+def read_snapshot(sheet_name, directory=None):
+    """Lê o snapshot de uma aba; retorna (DataFrame, metadados) ou None se não existir"""
+    data_path, meta_path = snapshot_paths(sheet_name, directory)
+    if not data_path.exists() or not meta_path.exists():
+        return None
     
-    .metric-value {
-        font-size: 2rem;
-        font-weight: 700;
-        color: #96CA00;
-        margin: 0;
-        font-family: 'Montserrat', sans-serif;
-    }
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    df = pd.read_parquet(data_path)
+    if len(df.columns) == len(meta["header"]):
+        df.columns = meta["header"]
+    else:
+        df = pd.DataFrame(columns=meta["header"])
+    return df, meta
+
+# Fontes de dados
+#
+# Toda fonte expõe get_values(aba, first_row, last_column) e batch_get_values(abas),
+# devolvendo a grade de valores crua (cabeçalho na primeira linha) como a API do
+# Google Sheets. `writes_snapshot` indica se a leitura deve ser gravada em disco e
+# `serves_snapshot` se o snapshot em disco pode ser servido no lugar da fonte.
+class GoogleSheetsSource:
+    """Lê as abas direto da planilha do Google Sheets"""
     
-    .metric-label {
-        font-size: 0.9rem;
-        color: #6c757d;
-        margin-top: 0.2rem;
-        font-family: 'Montserrat', sans-serif;
-        font-weight: 500;
-    }
+    name = "Google Sheets"
+    writes_snapshot = True
+    serves_snapshot = True
     
-    .logo-container {
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+    
+    def get_values(self, sheet_name, first_row=None, last_column=None):
+        """Grade de valores da aba inteira ou a partir da linha first_row (1 = cabeçalho)"""
+        if first_row is None:
+            range_name = absolute_range_name(sheet_name)
+        else:
+            range_name = absolute_range_name(sheet_name, f"A{first_row}:{last_column}")
+        return self.spreadsheet.values_get(range_name).get("values", [])
+    
+    def batch_get_values(self, sheet_names):
+        """Grades de valores de várias abas em uma única requisição (values_batch_get)"""
+        ranges = [absolute_range_name(sheet_name) for sheet_name in sheet_names]
+        response = self.spreadsheet.values_batch_get(ranges)
+        value_ranges = response.get("valueRanges", [])
+        return {
+            sheet_name: value_range.get("values", [])
+            for sheet_name, value_range in zip(sheet_names, value_ranges)
+        }
 
-# Função para carregar dados do Google Sheets
-@st.cache_data(ttl=300)  # Cache por 5 minutos
-def load_data():
+class LocalSource:
+    """Base das fontes locais: a aba inteira é lida de uma vez por read_values"""
+    
+    writes_snapshot = False
+    serves_snapshot = False
+    
+    def read_values(self, sheet_name):
+        raise NotImplementedError
+    
+    def get_values(self, sheet_name, first_row=None, last_column=None):
+        values = self.read_values(sheet_name)
+        return values if first_row is None else values[first_row - 1:]
+    
+    def batch_get_values(self, sheet_names):
+        return {sheet_name: self.read_values(sheet_name) for sheet_name in sheet_names}
+
+class SnapshotSource(LocalSource):
+    """Substituto local do Google Sheets que lê os snapshots em disco (testes/offline)"""
+    
+    name = "Snapshot local"
+    serves_snapshot = True
+    
+    def __init__(self, directory=None):
+        self.directory = directory
+    
+    def read_values(self, sheet_name):
+        snapshot = read_snapshot(sheet_name, self.directory)
+        if snapshot is None:
+            raise FileNotFoundError(f"Snapshot da aba {sheet_name} não encontrado")
+        
+        df, meta = snapshot
+        return [meta["header"]] + df.to_numpy(dtype=object).tolist()
+
+def frame_to_values(df):
+    """Grade de valores em texto a partir de um DataFrame (como a API devolve as células)"""
+    body = df.astype(object).where(df.notna(), "").astype(str)
+    return [[str(col) for col in df.columns]] + body.to_numpy(dtype=object).tolist()
+
+class FileSource(LocalSource):
+    """Lê as abas de arquivos locais (CSV, XLSX ou Parquet).
+    
+    `path` é uma pasta com um arquivo por aba (nome da aba ou nome sem acentos,
+    ex.: producao.parquet) ou uma pasta de trabalho .xlsx com uma planilha por
+    aba. Cada arquivo só é lido de novo quando muda em disco.
+    """
+    
+    name = "Arquivos locais"
+    extensions = [".parquet", ".csv", ".xlsx"]
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self._cache = {}  # aba -> (arquivo, data de modificação, grade)
+    
+    def sheet_path(self, sheet_name):
+        if self.path.is_file():
+            return self.path
+        for stem in (sheet_name, sheet_slug(sheet_name)):
+            for extension in self.extensions:
+                candidate = self.path / f"{stem}{extension}"
+                if candidate.exists():
+                    return candidate
+        raise FileNotFoundError(f"Arquivo da aba {sheet_name} não encontrado em {self.path}")
+    
+    def read_file(self, path, sheet_name):
+        if path.suffix == ".parquet":
+            return frame_to_values(pd.read_parquet(path))
+        if path.suffix == ".csv":
+            df = pd.read_csv(path, dtype=str, header=None, keep_default_na=False)
+        elif path.suffix == ".xlsx":
+            # Pasta de trabalho única: uma planilha por aba
+            worksheet = sheet_name if self.path.is_file() else 0
+            df = pd.read_excel(path, sheet_name=worksheet, dtype=str, header=None, keep_default_na=False)
+        else:
+            raise ValueError(f"Formato de arquivo não suportado: {path.suffix}")
+        return df.to_numpy(dtype=object).tolist()
+    
+    def read_values(self, sheet_name):
+        path = self.sheet_path(sheet_name)
+        mtime = path.stat().st_mtime_ns
+        cached = self._cache.get(sheet_name)
+        if cached is None or cached[:2] != (path, mtime):
+            cached = (path, mtime, self.read_file(path, sheet_name))
+            self._cache[sheet_name] = cached
+        return cached[2]
+
+class MemorySource(LocalSource):
+    """Fonte em memória para testes de carga e profiling, com latência simulada.
+    
+    Cada chamada a get_values/batch_get_values espera `latency` segundos, como
+    uma requisição à API. append_rows simula novas respostas do formulário.
+    """
+    
+    name = "Memória"
+    
+    def __init__(self, sheets, latency=0.0):
+        self.sheets = {sheet_name: [list(row) for row in values] for sheet_name, values in sheets.items()}
+        self.latency = latency
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def from_files(cls, path, latency=0.0):
+        """Carrega em memória as abas de uma fonte de arquivos locais"""
+        files = FileSource(path)
+        return cls({sheet_name: files.read_values(sheet_name) for sheet_name in SHEET_NAMES}, latency)
+    
+    def read_values(self, sheet_name):
+        with self.lock:
+            if sheet_name not in self.sheets:
+                raise KeyError(f"Aba {sheet_name} não existe na fonte em memória")
+            return list(self.sheets[sheet_name])
+    
+    def get_values(self, sheet_name, first_row=None, last_column=None):
+        time.sleep(self.latency)
+        return super().get_values(sheet_name, first_row, last_column)
+    
+    def batch_get_values(self, sheet_names):
+        time.sleep(self.latency)
+        return super().batch_get_values(sheet_names)
+    
+    def append_rows(self, sheet_name, rows):
+        with self.lock:
+            self.sheets[sheet_name].extend(list(row) for row in rows)
+
+# Fonte escolhida pela configuração: variáveis de ambiente têm prioridade sobre
+# a seção [fonte_dados] das secrets (tipo, caminho, latencia)
+DATA_SOURCES = {
+    "sheets": GoogleSheetsSource,
+    "snapshot": SnapshotSource,
+    "arquivos": FileSource,
+    "memoria": MemorySource,
+}
+
+def data_source_config():
+    """Tipo, caminho e latência da fonte de dados configurada"""
     try:
-        # Configurar credenciais do Google Sheets usando o arquivo JSON das secrets
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets.readonly",
-            "https://www.googleapis.com/auth/drive.readonly"
-        ]
+        config = dict(st.secrets.get("fonte_dados", {}))
+    except Exception:
+        # Sem secrets.toml (execução local/testes)
+        config = {}
+    
+    source_type = os.environ.get("DASHBOARD_DATA_SOURCE", config.get("tipo", "sheets"))
+    if source_type not in DATA_SOURCES:
+        raise ValueError(f"Fonte de dados desconhecida: {source_type} (opções: {', '.join(DATA_SOURCES)})")
+    return {
+        "tipo": source_type,
+        "caminho": os.environ.get("DASHBOARD_DATA_PATH", config.get("caminho")),
+        "latencia": float(os.environ.get("DASHBOARD_SOURCE_LATENCY", config.get("latencia", 0))),
+    }
+
+class LazyResource:
+    """Objeto do processo criado na primeira vez que é pedido, em qualquer thread.
+    
+    Só o contêiner fica no st.cache_resource e é resolvido na thread do script
+    sem custo; a criação, que pode ir à rede, acontece em quem pedir primeiro
+    (em geral o aquecimento em segundo plano). Falhas não ficam guardadas.
+    """
+    
+    def __init__(self, factory):
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.value = None
+    
+    def get(self):
+        if self.value is None:
+            with self.lock:
+                if self.value is None:
+                    self.value = self.factory()
+        return self.value
+
+@process_resource
+def get_data_source_holder():
+    """Contêiner da fonte de dados do processo (criada sob demanda)"""
+    return LazyResource(create_data_source)
+
+def get_data_source():
+    """Fonte de dados do processo, criada na primeira chamada"""
+    return get_data_source_holder().get()
+
+def create_data_source():
+    """Fonte de dados conforme data_source_config()"""
+    config = data_source_config()
+    source_type, path = config["tipo"], config["caminho"]
+    
+    if source_type == "sheets":
+        return GoogleSheetsSource(open_spreadsheet())
+    if source_type == "snapshot":
+        # Mesma pasta do snapshot restaurado na inicialização (DASHBOARD_SNAPSHOT_DIR)
+        return SnapshotSource()
+    if not path:
+        raise ValueError(f"A fonte '{source_type}' precisa do caminho dos arquivos (DASHBOARD_DATA_PATH)")
+    if source_type == "arquivos":
+        return FileSource(path)
+    return MemorySource.from_files(path, config["latencia"])
+
+class SheetData(NamedTuple):
+    """Cópia imutável de uma aba: trocada atomicamente a cada atualização"""
+    df: pd.DataFrame
+    version: int      # muda a cada alteração dos dados
+    generation: int   # muda só quando respostas já publicadas são editadas ou removidas
+    fetched_at: float
+
+def is_prefix(old_df, new_df):
+    """True se new_df apenas acrescenta linhas ao final de old_df"""
+    return (
+        len(new_df) >= len(old_df)
+        and list(new_df.columns) == list(old_df.columns)
+        and new_df.iloc[:len(old_df)].equals(old_df)
+    )
+
+class SheetState:
+    """Estado da sincronização incremental de uma aba, compartilhado entre sessões"""
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.header = []
+        self.data = None
+        self.last_row = None
+        self.last_full_sync = 0.0
+        self.from_snapshot = False
+        self.last_error = None
+        self.hits = 0    # leituras servidas da cópia em memória
+        self.misses = 0  # leituras que precisaram carregar a aba
+        self.snapshot_lock = threading.Lock()  # uma gravação do snapshot por vez
+        self.snapshot_version = None           # versão gravada em disco
+        self.snapshot_at = 0.0
+    
+    @property
+    def df(self):
+        return None if self.data is None else self.data.df
+    
+    @property
+    def row_count(self):
+        return 0 if self.data is None else len(self.data.df)
+    
+    @property
+    def fetched_at(self):
+        return 0.0 if self.data is None else self.data.fetched_at
+    
+    def publish(self, df, fetched_at=None, appended=False):
+        """Troca a cópia publicada por uma nova versão (leitores nunca veem estado parcial)"""
+        if self.data is None:
+            version, generation = 1, 1
+        else:
+            version = self.data.version + 1
+            generation = self.data.generation + (0 if appended else 1)
+        self.data = SheetData(df, version, generation, fetched_at or time.time())
+        self.last_error = None
+    
+    def replace(self, values):
+        """Substitui o conteúdo pela grade completa da aba; retorna True se algo mudou.
         
-        # Carregando credenciais do secrets.toml
-        credentials = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"], scopes=scopes
-        )
+        Se a releitura só trouxe linhas novas (ou nada mudou), a geração é mantida
+        para que os agregados incrementais continuem valendo.
+        """
+        header = values[0] if values else []
+        new_df = build_dataframe(values)
+        old_df = self.df
+        unchanged_prefix = old_df is not None and header == self.header and is_prefix(old_df, new_df)
         
-        client = gspread.authorize(credentials)
+        self.header = header
+        self.last_row = pad_row(values[-1], len(header)) if len(values) > 1 else None
+        self.last_full_sync = time.time()
+        self.from_snapshot = False
         
-        # ID da sua planilha
-        sheet_id = "1rwo4nu_DJNgUdb65UQ9e3AbiQacEHiRXA0hBbpvuULU"
-        spreadsheet = client.open_by_key(sheet_id)
+        if unchanged_prefix and len(new_df) == len(old_df):
+            self.touch()
+            return False
         
-        # Carregar cada aba
-        sheets_data = {}
-        sheet_names = ["PRODUÇÃO", "ADMINISTRATIVO", "COMERCIAL", "CLIMA"]
+        self.publish(new_df, appended=unchanged_prefix)
+        return True
+    
+    def append(self, rows):
+        """Acrescenta novas respostas ao final do DataFrame em cache"""
+        new_df = build_dataframe([self.header] + rows)
+        self.last_row = pad_row(rows[-1], len(self.header))
+        self.publish(pd.concat([self.df, new_df], ignore_index=True), appended=True)
+        self.from_snapshot = False
+    
+    def touch(self):
+        """Registra uma verificação sem mudanças nos dados"""
+        self.data = self.data._replace(fetched_at=time.time())
+        self.from_snapshot = False
+        self.last_error = None
+    
+    def restore(self, df, meta):
+        """Carrega o snapshot em disco como ponto de partida da sincronização"""
+        self.header = meta["header"]
+        self.last_row = df.iloc[-1].tolist() if len(df) else None
+        self.publish(df, meta["fetched_at"])
+        self.last_full_sync = meta["last_full_sync"]
+        self.from_snapshot = True
+        self.snapshot_version = self.data.version
+        self.snapshot_at = time.time()
+    
+    def snapshot_due(self, force=False):
+        """Cópia a gravar em disco, ou None (chamar com o lock adquirido).
+        
+        Versões só com respostas acrescentadas são gravadas no máximo uma vez
+        por SNAPSHOT_INTERVAL; `force` grava logo (releitura completa).
+        """
+        if self.data is None or self.data.version == self.snapshot_version:
+            return None
+        if not force and time.time() - self.snapshot_at < SNAPSHOT_INTERVAL:
+            return None
+        return self.data, self.header, self.last_full_sync
+    
+    def snapshot_outdated(self, version):
+        """Se `version` é mais nova que a do disco (chamar com o lock adquirido)"""
+        return self.snapshot_version is None or version > self.snapshot_version
+
+@process_resource
+def get_sheet_states():
+    """Estados de sincronização por aba (um por processo)"""
+    return {sheet_name: SheetState() for sheet_name in SHEET_NAMES}
+
+def save_snapshot(source, sheet_name, state, force=False):
+    """Grava o snapshot da aba sem interromper o carregamento em caso de falha.
+    
+    Chamar sem state.lock: a gravação reescreve o arquivo inteiro e não deve
+    segurar as leituras da aba. Se outra gravação estiver em andamento, esta é
+    pulada; a versão pendente vai para o disco na próxima sincronização. Uma
+    cópia que ficou mais velha que a gravada enquanto esperava também é pulada,
+    para não sobrescrever o snapshot mais novo.
+    """
+    if not source.writes_snapshot:
+        return
+    with state.lock:
+        pending = state.snapshot_due(force)
+    if pending is None or not state.snapshot_lock.acquire(blocking=False):
+        return
+    try:
+        data, header, last_full_sync = pending
+        with state.lock:
+            if not state.snapshot_outdated(data.version):
+                return
+        write_snapshot(sheet_name, data, header, last_full_sync)
+        with state.lock:
+            state.snapshot_version = data.version
+            state.snapshot_at = time.time()
+    except Exception:
+        logger.exception("Falha ao gravar o snapshot da aba %s", sheet_name)
+    finally:
+        state.snapshot_lock.release()
+
+def restore_snapshot(sheet_name, state):
+    """Restaura a aba a partir do snapshot em disco (chamar com state.lock adquirido)"""
+    # Fontes locais são lidas direto: o snapshot pode ser de outra fonte
+    if not DATA_SOURCES[data_source_config()["tipo"]].serves_snapshot:
+        return False
+    try:
+        snapshot = read_snapshot(sheet_name)
+    except Exception:
+        logger.exception("Snapshot da aba %s ilegível", sheet_name)
+        return False
+    if snapshot is None:
+        return False
+    state.restore(*snapshot)
+    return True
+
+def sync_sheet(source, sheet_name):
+    """Sincroniza uma aba buscando apenas as linhas novas desde a última leitura.
+    
+    As respostas do Google Forms só crescem por linhas acrescentadas. A leitura
+    incremental começa na última linha conhecida: se ela mudou, alguma resposta
+    foi editada ou removida e a aba é relida por completo. A cada
+    FULL_SYNC_INTERVAL a releitura completa é feita de qualquer forma.
+    """
+    state = get_sheet_states()[sheet_name]
+    with state.lock:
+        full_sync = update_sheet(source, sheet_name, state)
+        data = state.data
+    # Fora do lock: a gravação do arquivo não atrasa as leituras da aba
+    save_snapshot(source, sheet_name, state, force=full_sync)
+    return data
+
+def update_sheet(source, sheet_name, state):
+    """Leitura incremental ou completa da aba (chamar com state.lock adquirido);
+    retorna True se foi feita a releitura completa"""
+    needs_full_sync = (
+        state.row_count == 0
+        or time.time() - state.last_full_sync > FULL_SYNC_INTERVAL
+    )
+    
+    if not needs_full_sync:
+        width = len(state.header)
+        last_column = rowcol_to_a1(1, width).rstrip("0123456789")
+        # Linha 1 é o cabeçalho: a última resposta conhecida está em row_count + 1
+        rows = source.get_values(sheet_name, state.row_count + 1, last_column)
+        
+        if rows and pad_row(rows[0], width) == state.last_row:
+            if len(rows) > 1:
+                state.append(rows[1:])
+            else:
+                state.touch()
+            return False
+    
+    state.replace(source.get_values(sheet_name))
+    return True
+
+# Atualização em segundo plano (stale-while-revalidate)
+REFRESH_INTERVAL = 300  # 5 minutos
+
+class BackgroundRefresher:
+    """Único worker do processo que mantém atualizadas as abas já carregadas.
+    
+    As sessões só leem a última cópia publicada de cada aba; nenhuma rerun
+    espera pelo Google Sheets depois da primeira carga, e como só este worker
+    consulta a API, sessões simultâneas não disparam atualizações duplicadas.
+    """
+    
+    def __init__(self, interval=REFRESH_INTERVAL):
+        self.interval = interval
+        self.wake = threading.Event()
+        self.thread = None
+        self.start_lock = threading.Lock()
+    
+    def start(self, resources):
+        """Inicia o worker com os singletons resolvidos na thread do script"""
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, args=(resources,), name="sheets-refresher", daemon=True
+                )
+                self.thread.start()
+    
+    def request_refresh(self):
+        """Antecipa o próximo ciclo (ex.: logo após servir um snapshot do disco)"""
+        self.wake.set()
+    
+    def run(self, resources):
+        use_worker_resources(resources)
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.refresh_all()
+    
+    def refresh_all(self):
+        states = get_sheet_states()
+        loaded = [name for name in SHEET_NAMES if states[name].data is not None]
+        if not loaded:
+            return
+        
+        try:
+            source = get_data_source()
+        except Exception as e:
+            logger.warning("Sem conexão com a fonte de dados: %s", e)
+            for sheet_name in loaded:
+                states[sheet_name].last_error = str(e)
+            return
         
-        for sheet_name in sheet_names:
+        updated = []
+        for sheet_name in loaded:
+            version = states[sheet_name].data.version
             try:
-                worksheet = spreadsheet.worksheet(sheet_name)
-                data = worksheet.get_all_records()
-                if data:
-                    df = pd.DataFrame(data)
-                    sheets_data[sheet_name] = df
-                    
-                else:
-                    sheets_data[sheet_name] = pd.DataFrame()
-                    st.warning(f"⚠️ Aba {sheet_name} está vazia")
+                data = sync_sheet(source, sheet_name)
             except Exception as e:
-                st.error(f"❌ Erro ao carregar aba {sheet_name}: {str(e)}")
-                sheets_data[sheet_name] = pd.DataFrame()
+                logger.exception("Falha ao atualizar a aba %s", sheet_name)
+                states[sheet_name].last_error = str(e)
+                continue
+            if data.version != version:
+                updated.append(sheet_name)
         
-        return sheets_data
+        # Nova versão publicada: as chaves dos caches mudaram, aquecer de novo
+        for sheet_name in updated:
+            try:
+                warm_sheet(sheet_name, states[sheet_name].data)
+            except Exception:
+                logger.exception("Falha ao aquecer a aba %s", sheet_name)
+        if updated:
+            warm_comparison(states)
+
+@process_resource
+def get_refresher():
+    """Worker de atualização do processo (iniciado por start_workers)"""
+    return BackgroundRefresher()
+
+def get_sheet_data(sheet_name):
+    """Última cópia publicada de uma aba; só bloqueia na primeira carga do processo.
+    
+    Sem cópia em memória, o snapshot em disco é servido e revalidado em segundo
+    plano; sem snapshot, a aba é lida da fonte. O lock da aba faz as sessões que
+    chegam juntas esperarem por essa única leitura. Erros de conexão propagam.
+    """
+    state = get_sheet_states()[sheet_name]
+    refresher = get_refresher()
+    
+    if state.data is None:
+        with state.lock:
+            if state.data is None:
+                state.misses += 1
+                with timed_stage("carregar_aba", aba=sheet_name):
+                    if restore_snapshot(sheet_name, state):
+                        refresher.request_refresh()
+                    else:
+                        sync_sheet(get_data_source(), sheet_name)
+                return state.data
+    
+    state.hits += 1
+    return state.data
+
+def load_sheet(sheet_name):
+    """Carrega uma única aba; retorna None se não for possível conectar à planilha"""
+    state = get_sheet_states()[sheet_name]
+    try:
+        data = get_sheet_data(sheet_name)
+    except Exception as e:
+        if state.data is None:
+            show_connection_error(e)
+            return None
+        data = state.data
+    
+    if state.last_error:
+        st.warning(f"⚠️ Falha ao atualizar a aba {sheet_name}, exibindo a última cópia: {state.last_error}")
+    if data.df.empty:
+        st.warning(f"⚠️ Aba {sheet_name} está vazia")
+    return data.df
+
+@process_resource
+def get_batch_lock():
+    """Lock da leitura em lote das abas ausentes (uma requisição por vez no processo)"""
+    return threading.Lock()
+
+def load_all_sheets():
+    """Carrega todas as abas; as que ainda não estão em memória vêm em uma única
+    requisição em lote (values_batch_get)"""
+    states = get_sheet_states()
+    refresher = get_refresher()
     
+    missing = []
+    for sheet_name in SHEET_NAMES:
+        state = states[sheet_name]
+        # Aba em memória: leitura sem lock (o worker pode estar sincronizando)
+        if state.data is not None:
+            state.hits += 1
+            continue
+        with state.lock:
+            if state.data is not None:
+                state.hits += 1
+                continue
+            state.misses += 1
+            if restore_snapshot(sheet_name, state):
+                refresher.request_refresh()
+        if state.data is None:
+            missing.append(sheet_name)
+    
+    if missing:
+        # Um único lote por vez: as sessões que chegam juntas esperam a mesma leitura
+        with get_batch_lock():
+            missing = [sheet_name for sheet_name in missing if states[sheet_name].data is None]
+            if missing:
+                source = get_data_source()
+                all_values = source.batch_get_values(missing)
+                for sheet_name in missing:
+                    state = states[sheet_name]
+                    with state.lock:
+                        # Uma carga aba por aba pode ter chegado antes
+                        if state.data is None:
+                            state.replace(all_values.get(sheet_name, []))
+        for sheet_name in missing:
+            save_snapshot(source, sheet_name, states[sheet_name], force=True)
+    
+    return {sheet_name: states[sheet_name].df for sheet_name in SHEET_NAMES}
+
+def load_data():
+    """Carrega todas as abas, preferindo a requisição em lote"""
+    try:
+        with timed_stage("load_data"):
+            sheets_data = load_all_sheets()
     except Exception as e:
-        st.error(f"❌ Erro ao conectar com Google Sheets: {str(e)}")
-        st.info("🔧 Verifique se:")
-        st.write("- As credenciais estão corretas no arquivo secrets.toml")
-        st.write("- A planilha foi compartilhada com o email da Service Account")
-        st.write("- As APIs do Google Sheets e Drive estão ativadas")
-        return {}
+        # Uma aba inexistente derruba o lote inteiro: carregar aba por aba
+        st.warning(f"⚠️ Falha na leitura em lote, carregando aba por aba: {str(e)}")
+        sheets_data = {}
+        for sheet_name in SHEET_NAMES:
+            df = load_sheet(sheet_name)
+            if df is None:
+                return {}
+            sheets_data[sheet_name] = df
+    
+    return sheets_data
 
 # Mapeamento das colunas por categoria
 ASPECTOS_PESSOAIS = [
@@ -287,49 +922,889 @@ CLIMA_ORGANIZACIONAL = [
     "O quanto você se sente realizado(a) profissionalmente?  "
 ]
 
+# Registro das perguntas: IDs curtos e estáveis no lugar do texto do formulário
+class Question(NamedTuple):
+    id: str        # ex.: "AP01"
+    category: str  # nome da categoria
+    text: str      # texto da pergunta no formulário
+    label: str     # nome curto para títulos e eixos
+
+QUESTION_CATEGORIES = [
+    ("ASPECTOS PESSOAIS", "AP", ASPECTOS_PESSOAIS),
+    ("DESENVOLVIMENTO", "DV", DESENVOLVIMENTO),
+    ("DESEMPENHO PROFISSIONAL", "DP", DESEMPENHO_PROFISSIONAL),
+    ("CLIMA ORGANIZACIONAL", "CL", CLIMA_ORGANIZACIONAL),
+]
+
+def normalize_header(text):
+    """Forma canônica do cabeçalho: ignora quebras de linha, espaços extras,
+    maiúsculas/minúsculas e o tipo de apóstrofo"""
+    text = unicodedata.normalize("NFC", str(text)).replace("’", "'").replace("‘", "'")
+    return " ".join(text.split()).casefold()
+
+def fold_text(text):
+    """Texto sem acentos e em minúsculas, para comparação e busca"""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def short_question_name(col):
+    """Nome curto da pergunta para títulos e eixos"""
+    short_name = col.split('(')[0].strip()
+    
+    # Renomear "Faz uso correto dos EPI's" para "Segurança"
+    if "EPI" in col:
+        short_name = "Segurança"
+    
+    return short_name
+
+QUESTIONS = {}
+CATEGORY_QUESTIONS = {}
+for _category, _prefix, _texts in QUESTION_CATEGORIES:
+    CATEGORY_QUESTIONS[_category] = []
+    for _number, _text in enumerate(_texts, start=1):
+        _question = Question(f"{_prefix}{_number:02d}", _category, _text, short_question_name(_text))
+        QUESTIONS[_question.id] = _question
+        CATEGORY_QUESTIONS[_category].append(_question.id)
+
+QUESTION_IDS_BY_HEADER = {normalize_header(q.text): q.id for q in QUESTIONS.values()}
+
+def question_columns(columns):
+    """Mapeia os cabeçalhos da planilha reconhecidos para o ID da pergunta"""
+    mapping = {}
+    for col in columns:
+        question_id = QUESTION_IDS_BY_HEADER.get(normalize_header(col))
+        if question_id and question_id not in mapping.values():
+            mapping[col] = question_id
+    return mapping
+
+# Esquema das colunas da planilha
+# Notas de 1 a 10 (IDs de todas as perguntas das categorias)
+RATING_COLUMNS = list(QUESTIONS)
+RATING_DTYPE = np.float32
+
+# Identificação da avaliação (poucos valores distintos: armazenadas como category)
+IDENTITY_COLUMNS = ['AVALIADOR', 'CARGO', 'COLABORADOR', 'CARGO DO COLABORADOR', 'SETOR']
+
+# Carimbo de data/hora do Google Forms em pt-BR, seguido dos formatos aceitos
+# para valores digitados ou exportados de outra forma
+TIMESTAMP_FORMATS = ["%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "ISO8601"]
+
+def parse_timestamps(values):
+    """Converte os carimbos de data/hora com formatos explícitos.
+    
+    Sem formato o pandas deduz o formato pelo primeiro valor do lote, e o mesmo
+    texto poderia virar outra data (dia e mês trocados) ou NaT conforme as
+    linhas lidas juntas. Cada formato é tentado nos valores ainda não
+    convertidos; o que não servir em nenhum vira NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    pending = values.notna()
+    for timestamp_format in TIMESTAMP_FORMATS:
+        if not pending.any():
+            break
+        converted = pd.to_datetime(values[pending], format=timestamp_format, errors='coerce')
+        parsed[converted.index] = converted
+        pending &= parsed.isna()
+    return parsed
+
+def convert_ratings(df, columns):
+    """Converte as colunas de nota para um único bloco, descartando valores fora de 1-10.
+    
+    Cada coluna tem poucos textos distintos ("1" a "10", vazios e alguns
+    valores inválidos): só os valores únicos são convertidos e o resultado é
+    espalhado de volta pelos códigos do factorize.
+    """
+    scores = np.empty((len(df), len(columns)), dtype=RATING_DTYPE)
+    for position, col in enumerate(columns):
+        codes, uniques = pd.factorize(df[col])
+        values = pd.to_numeric(np.asarray(uniques, dtype=object), errors='coerce').astype(RATING_DTYPE)
+        values[(values < 1) | (values > 10)] = np.nan
+        # Código -1 (célula nula) aponta para o NaN acrescentado no fim
+        scores[:, position] = np.append(values, RATING_DTYPE(np.nan))[codes]
+    return pd.DataFrame(scores, index=df.index, columns=columns)
+
 def process_dataframe(df):
     """Processa o DataFrame para converter datas e valores numéricos"""
     if df.empty:
         return df
     
-    # Fazer uma cópia para não modificar o original
-    df = df.copy()
+    # Perguntas passam a ser identificadas pelo ID do registro (cópia rasa:
+    # as colunas convertidas são substituídas sem alterar o original)
+    mapping = question_columns(df.columns)
+    df = df.copy(deep=False)
+    df.columns = [mapping.get(col, col) for col in df.columns]
     
     # Converter coluna de data
     if 'Carimbo de data/hora' in df.columns:
         try:
-            df['Carimbo de data/hora'] = pd.to_datetime(df['Carimbo de data/hora'], errors='coerce')
+            df['Carimbo de data/hora'] = parse_timestamps(df['Carimbo de data/hora'])
             df['Data'] = df['Carimbo de data/hora'].dt.date
         except Exception as e:
             st.warning(f"Erro ao processar datas: {str(e)}")
             df['Data'] = None
     
-    # Converter colunas numéricas (escala 1-10)
-    numeric_columns = []
-    for col in df.columns:
-        # Pular colunas não numéricas
-        if col in ['Carimbo de data/hora', 'AVALIADOR', 'CARGO', 'COLABORADOR', 'CARGO DO COLABORADOR', 'SETOR', 'Data']:
-            continue
-        if col.startswith('OBSERVAÇÕES'):
-            continue
+    # Converter as colunas de nota (escala 1-10) em um único bloco
+    rating_columns = [col for col in RATING_COLUMNS if col in df.columns]
+    if rating_columns:
+        df[rating_columns] = convert_ratings(df, rating_columns)
+    
+    # Colunas de identificação como category
+    for col in IDENTITY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    return df
+
+# Histogramas de notas pré-calculados
+SCORE_BUCKETS = 10  # notas de 1 a 10
+
+class ScoreSelection(NamedTuple):
+    """Distribuição das notas de cada pergunta para uma combinação de filtros"""
+    questions: list
+    counts: np.ndarray  # (perguntas, 10): quantidade de cada nota
+    sums: np.ndarray    # (perguntas,): soma exata das notas
+    rows: int           # avaliações selecionadas
+    
+    def position(self, question):
+        """Posição da pergunta nos arrays, ou None se a aba não tiver a coluna"""
+        try:
+            return self.questions.index(question)
+        except ValueError:
+            return None
+
+def score_buckets(scores):
+    """Índice do balde (0-9) de cada nota; notas fracionadas caem na parte inteira"""
+    return np.floor(scores).astype(np.int64) - 1
+
+def score_histograms(columns, group_ids, n_groups):
+    """Contagem de cada nota e soma das notas por (grupo, pergunta).
+    
+    Uma pergunta por vez: a memória temporária é da ordem de uma coluna.
+    """
+    counts = np.zeros((n_groups, len(columns), SCORE_BUCKETS), dtype=np.int64)
+    sums = np.zeros((n_groups, len(columns)), dtype=np.float64)
+    for position, values in enumerate(columns):
+        valid = ~np.isnan(values)
+        scores = values[valid].astype(np.float64)
+        groups = group_ids[valid]
+        counts[:, position] = np.bincount(
+            groups * SCORE_BUCKETS + score_buckets(scores), minlength=n_groups * SCORE_BUCKETS
+        ).reshape(n_groups, SCORE_BUCKETS)
+        sums[:, position] = np.bincount(groups, weights=scores, minlength=n_groups)
+    return counts, sums
+
+class ScoreHistograms:
+    """Contagem de cada nota (1-10) por pergunta, acumulada dia a dia.
+    
+    Montado uma vez por versão dos dados com um histograma por dia (todos os
+    colaboradores) e a soma acumulada sobre os dias: qualquer período é a
+    diferença de duas posições. As respostas sem data ficam em um último grupo,
+    incluído só quando não há filtro de período. Para um colaborador são
+    contadas apenas as suas linhas (posições do SheetIndex, se informado).
+    """
+    
+    def __init__(self, df, index=None):
+        self.df = df
+        self.index = index
+        self.questions = [col for col in RATING_COLUMNS if col in df.columns]
+        self.has_dates = 'Data' in df.columns
+        
+        row_days = self.row_days()
+        dated = ~np.isnat(row_days)
+        self.days, day_ids = np.unique(row_days[dated], return_inverse=True)
+        n_days = len(self.days)
+        group_ids = np.full(len(df), n_days, dtype=np.int64)
+        group_ids[dated] = day_ids
+        
+        counts, sums = score_histograms(self.scores(), group_ids, n_days + 1)
+        rows = np.bincount(group_ids, minlength=n_days + 1)
+        
+        # Acumulados com um zero no início: os grupos [i, j) somam acumulado[j] - acumulado[i]
+        self.counts = np.zeros((n_days + 2, *counts.shape[1:]), dtype=np.int32)
+        np.cumsum(counts, axis=0, out=self.counts[1:])
+        self.sums = np.zeros((n_days + 2, sums.shape[1]), dtype=np.float64)
+        np.cumsum(sums, axis=0, out=self.sums[1:])
+        self.rows = np.zeros(n_days + 2, dtype=np.int64)
+        np.cumsum(rows, out=self.rows[1:])
+    
+    def row_days(self):
+        """Dia de cada linha (NaT sem data)"""
+        if self.has_dates:
+            return pd.to_datetime(self.df['Data']).to_numpy(dtype='datetime64[D]')
+        return np.full(len(self.df), np.datetime64('NaT'), dtype='datetime64[D]')
+    
+    def scores(self, positions=None):
+        """Notas de cada pergunta (uma coluna por pergunta), opcionalmente só das posições dadas"""
+        columns = [self.df[col].to_numpy(dtype=RATING_DTYPE) for col in self.questions]
+        if positions is not None:
+            columns = [values[positions] for values in columns]
+        return columns
+    
+    def select(self, start_date=None, end_date=None, selected_colaborador=None):
+        """Distribuição das notas com os mesmos filtros de filter_dataframe"""
+        by_date = self.has_dates and start_date and end_date
+        
+        if selected_colaborador and selected_colaborador != "Todos":
+            return self.select_colaborador(start_date, end_date, selected_colaborador, by_date)
+        
+        if by_date:
+            lo = np.searchsorted(self.days, np.datetime64(start_date, 'D'), side='left')
+            hi = np.searchsorted(self.days, np.datetime64(end_date, 'D'), side='right')
+        else:
+            lo, hi = 0, len(self.rows) - 1
+        return ScoreSelection(
+            self.questions,
+            self.counts[hi] - self.counts[lo],
+            self.sums[hi] - self.sums[lo],
+            int(self.rows[hi] - self.rows[lo]),
+        )
+    
+    def select_colaborador(self, start_date, end_date, selected_colaborador, by_date):
+        """Histograma só das linhas do colaborador no período"""
+        if 'COLABORADOR' not in self.df.columns:
+            positions = np.arange(len(self.df))
+        elif self.index is not None:
+            positions = self.index.positions.get(selected_colaborador, np.array([], dtype=np.intp))
+        else:
+            positions = np.flatnonzero((self.df['COLABORADOR'] == selected_colaborador).to_numpy())
+        
+        if by_date:
+            if self.index is not None:
+                lo, hi = self.index.date_range(start_date, end_date)
+                positions = positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)]
+            else:
+                days = self.row_days()[positions]
+                positions = positions[
+                    (days >= np.datetime64(start_date, 'D')) & (days <= np.datetime64(end_date, 'D'))
+                ]
+        
+        counts, sums = score_histograms(
+            self.scores(positions), np.zeros(len(positions), dtype=np.int64), 1
+        )
+        return ScoreSelection(self.questions, counts[0], sums[0], len(positions))
+
+class SheetIndex:
+    """Índice de uma aba processada (ordenada pelo carimbo de data/hora).
+    
+    As datas ficam em um array ordenado para recortar o período por busca
+    binária, e cada colaborador aponta para as posições das suas linhas.
+    """
+    
+    def __init__(self, df):
+        if 'Data' in df.columns:
+            dates = pd.to_datetime(df['Data']).to_numpy(dtype='datetime64[D]')
+        else:
+            dates = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[D]')
+        # Datas inválidas ficam no fim após a ordenação
+        self.n_dated = int((~np.isnat(dates)).sum())
+        self.dates = dates[:self.n_dated]
+        
+        if 'COLABORADOR' in df.columns:
+            self.positions = df.groupby('COLABORADOR', observed=True, sort=True).indices
+        else:
+            self.positions = {}
+        self.colaboradores = list(self.positions)
+    
+    @property
+    def min_date(self):
+        return self.dates[0].astype(date) if self.n_dated else None
+    
+    @property
+    def max_date(self):
+        return self.dates[-1].astype(date) if self.n_dated else None
+    
+    def date_range(self, start_date, end_date):
+        """Intervalo [início, fim) das linhas dentro do período"""
+        lo = np.searchsorted(self.dates, np.datetime64(start_date, 'D'), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(end_date, 'D'), side='right')
+        return int(lo), int(hi)
+
+# Comentários livres (colunas OBSERVAÇÕES*)
+WORD_PATTERN = re.compile(r"\w+")
+
+def is_comment_column(col):
+    return fold_text(col).strip().startswith("observac")
+
+class CommentIndex:
+    """Comentários de uma aba processada, com índice invertido de palavras.
+    
+    Cada comentário não vazio vira uma entrada (linha da aba, coluna, texto) na
+    ordem das linhas, que já estão ordenadas pelo carimbo de data/hora: o
+    recorte por período e colaborador reaproveita as posições do SheetIndex.
+    O índice invertido liga cada palavra (sem acento, minúscula) às entradas
+    que a contêm; a busca aceita prefixos ("pontual" encontra "pontualidade").
+    """
+    
+    def __init__(self, df):
+        self.column_names = {
+            position: str(col) for position, col in enumerate(df.columns) if is_comment_column(col)
+        }
+        
+        rows, columns, texts = [], [], []
+        for position in self.column_names:
+            values = df.iloc[:, position].fillna("").astype(str).str.strip().to_numpy(dtype=object)
+            filled = np.flatnonzero(values != "")
+            rows.append(filled)
+            columns.append(np.full(len(filled), position))
+            texts.append(values[filled])
+        
+        rows = np.concatenate(rows) if rows else np.array([], dtype=np.intp)
+        columns = np.concatenate(columns) if columns else np.array([], dtype=np.intp)
+        texts = np.concatenate(texts) if texts else np.array([], dtype=object)
+        order = np.lexsort((columns, rows))
+        self.rows, self.columns, self.texts = rows[order], columns[order], texts[order]
+        
+        postings = {}
+        for entry, text in enumerate(self.texts):
+            for word in set(WORD_PATTERN.findall(fold_text(text))):
+                postings.setdefault(word, []).append(entry)
+        self.vocabulary = sorted(postings)
+        self.postings = [np.array(postings[word], dtype=np.intp) for word in self.vocabulary]
+    
+    def __len__(self):
+        return len(self.texts)
+    
+    def lookup(self, prefix):
+        """Entradas com alguma palavra que começa com `prefix`"""
+        matches = []
+        i = bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            matches.append(self.postings[i])
+            i += 1
+        return np.unique(np.concatenate(matches)) if matches else np.array([], dtype=np.intp)
+    
+    def search(self, query="", row_range=None, row_positions=None):
+        """Entradas (em ordem cronológica) com todas as palavras da busca, dentro
+        do intervalo de linhas [início, fim) e das linhas do colaborador"""
+        entries = np.arange(len(self.texts))
+        if row_range is not None:
+            lo, hi = np.searchsorted(self.rows, row_range, side='left')
+            entries = entries[lo:hi]
+        if row_positions is not None:
+            entries = entries[np.isin(self.rows[entries], row_positions)]
+        for word in WORD_PATTERN.findall(fold_text(query)):
+            entries = np.intersect1d(entries, self.lookup(word), assume_unique=True)
+        return entries
+
+# Estatísticas do dashboard calculadas em uma única passada
+SECTOR_CATEGORIES = [
+    (name, CATEGORY_QUESTIONS[name])
+    for name in ["ASPECTOS PESSOAIS", "DESENVOLVIMENTO", "DESEMPENHO PROFISSIONAL"]
+]
+CLIMA_CATEGORIES = [("CLIMA ORGANIZACIONAL", CATEGORY_QUESTIONS["CLIMA ORGANIZACIONAL"])]
+
+def categories_for(sheet_name):
+    """Categorias analisadas em cada aba"""
+    return CLIMA_CATEGORIES if sheet_name == "CLIMA" else SECTOR_CATEGORIES
+
+class QuestionStats(NamedTuple):
+    question: str            # ID da pergunta
+    count: int
+    mean: float              # NaN sem respostas
+    distribution: np.ndarray # quantidade de cada nota (1-10)
+
+class CategoryStats(NamedTuple):
+    name: str
+    columns: list    # IDs das perguntas esperadas
+    questions: list  # QuestionStats das perguntas presentes na aba
+    mean: float      # média das médias das perguntas; NaN sem respostas
+
+class DashboardStats(NamedTuple):
+    rows: int
+    categories: list
+    overall_mean: float  # média das médias de todas as perguntas; NaN sem respostas
+
+def nan_mean(values):
+    """Média ignorando NaN (NaN se não houver valores)"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    return values.mean() if len(values) else np.nan
+
+def compute_statistics(selection, categories):
+    """Médias, contagens e distribuições por pergunta, categoria e geral.
+    
+    Opera sobre a distribuição já selecionada (ScoreSelection): todas as
+    perguntas são calculadas de uma vez e a renderização só lê o resultado.
+    """
+    counts = selection.counts.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, selection.sums / np.maximum(counts, 1), np.nan)
+    
+    category_stats = []
+    all_means = []
+    for name, columns in categories:
+        questions = []
+        for col in columns:
+            position = selection.position(col)
+            if position is None:
+                continue
+            questions.append(QuestionStats(
+                col, int(counts[position]), float(means[position]), selection.counts[position]
+            ))
+        question_means = [q.mean for q in questions]
+        all_means.extend(question_means)
+        category_stats.append(CategoryStats(name, columns, questions, nan_mean(question_means)))
+    
+    return DashboardStats(selection.rows, category_stats, nan_mean(all_means))
+
+# Ranking de colaboradores
+RANKING_BANDS = ["10% inferiores", "10-25%", "25-50%", "50-75%", "75-90%", "10% superiores"]
+RANKING_BAND_EDGES = [0, 0.10, 0.25, 0.50, 0.75, 0.90, 1.0]
+
+def collaborator_ranking(df, categories):
+    """Médias por categoria, média geral e avaliações de cada colaborador.
+    
+    Um único agrupamento por colaborador soma as notas e conta as respostas de
+    todas as perguntas; as médias seguem a regra do dashboard (média das médias
+    das perguntas). O percentil é a posição da média geral entre os colaboradores.
+    """
+    category_names = [name for name, _ in categories]
+    columns = ['Posição', 'Colaborador', 'Avaliações', *category_names, 'Média geral', 'Percentil', 'Faixa']
+    questions = [col for col in RATING_COLUMNS if col in df.columns]
+    if df.empty or 'COLABORADOR' not in df.columns or not questions:
+        return pd.DataFrame(columns=columns)
+    
+    grouped = df.groupby('COLABORADOR', observed=True, sort=False)
+    sums = grouped[questions].sum()
+    counts = grouped[questions].count()
+    question_means = sums / counts.where(counts > 0)
+    
+    ranking = pd.DataFrame({'Avaliações': grouped.size()})
+    category_questions = []
+    for name, category_columns in categories:
+        present = [col for col in category_columns if col in question_means.columns]
+        category_questions.extend(present)
+        ranking[name] = question_means[present].mean(axis=1) if present else np.nan
+    ranking['Média geral'] = question_means[category_questions].mean(axis=1)
+    
+    ranking['Percentil'] = ranking['Média geral'].rank(pct=True) * 100
+    ranking['Faixa'] = pd.cut(
+        ranking['Percentil'] / 100, RANKING_BAND_EDGES, labels=RANKING_BANDS, include_lowest=True
+    )
+    
+    ranking = ranking.sort_values(['Média geral', 'Avaliações'], ascending=False, na_position='last')
+    ranking['Posição'] = np.arange(1, len(ranking) + 1)
+    ranking = ranking.rename_axis('Colaborador').reset_index()
+    ranking['Colaborador'] = ranking['Colaborador'].astype(str)
+    return ranking[columns]
+
+# Cache do processamento por aba e versão dos dados
+class LRUCache:
+    """Cache LRU compartilhado entre sessões, com contadores de acertos e falhas.
+    
+    Com `max_bytes`, `sizeof(valor)` estima a memória de cada item e os menos
+    usados são descartados até o total caber no limite. Pedidos simultâneos da
+    mesma chave ausente são calculados uma única vez: quem chega depois espera
+    o resultado do primeiro (contado em `shared`).
+    """
+    
+    def __init__(self, maxsize, max_bytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.pending = {}  # chave -> Future do cálculo em andamento
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+    
+    def get_or_compute(self, key, compute):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            pending = self.pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self.pending[key] = Future()
+                self.misses += 1
+            else:
+                self.shared += 1
+        
+        if not owner:
+            try:
+                return pending.result()
+            except CancelledError:
+                return self.get_or_compute(key, compute)
         
         try:
-            # Converter para numérico
-            original_values = df[col].copy()
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+            value = compute()
+            size = self.sizeof(value) if self.sizeof else 0
+        except Exception as e:
+            self.abandon(key)
+            pending.set_exception(e)
+            raise
+        except BaseException:
+            # Execução interrompida (ex.: rerun do Streamlit): quem espera calcula de novo
+            self.abandon(key)
+            pending.cancel()
+            raise
+        
+        with self.lock:
+            if key in self.items:
+                self.total_bytes -= self.sizes[key]
+            self.items[key] = value
+            self.items.move_to_end(key)
+            self.sizes[key] = size
+            self.total_bytes += size
+            self.evict()
+            del self.pending[key]
+        pending.set_result(value)
+        return value
+    
+    def abandon(self, key):
+        """Remove o cálculo em andamento que terminou sem valor"""
+        with self.lock:
+            del self.pending[key]
+    
+    def evict(self):
+        """Descarta os itens menos usados acima dos limites (mantém sempre o mais recente)"""
+        while len(self.items) > 1 and (
+            len(self.items) > self.maxsize
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            key, _ = self.items.popitem(last=False)
+            self.total_bytes -= self.sizes.pop(key)
+    
+    def peek(self, key):
+        """Valor em cache sem contar acerto nem mudar a ordem (None se ausente)"""
+        with self.lock:
+            return self.items.get(key)
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "size": len(self.items),
+                "bytes": self.total_bytes,
+            }
+
+class shared_property:
+    """Propriedade calculada uma única vez por instância, mesmo com várias sessões.
+    
+    Como functools.cached_property, mas com uma trava por instância e atributo:
+    quem pede enquanto o valor é montado espera por ele em vez de montar outro.
+    A instância precisa de um dicionário `locks`.
+    """
+    
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        values = instance.__dict__
+        if self.name not in values:
+            with instance.locks.setdefault(self.name, threading.Lock()):
+                if self.name not in values:
+                    values[self.name] = self.func(instance)
+        return values[self.name]
+
+class ProcessedSheet:
+    """Aba já processada (datas e notas convertidas) para uma versão dos dados.
+    
+    O DataFrame é compartilhado entre sessões: tratar como somente leitura.
+    Índice, histogramas, comentários e ranking são montados na primeira vez que
+    alguma sessão os usa, uma única vez por versão.
+    """
+    
+    def __init__(self, sheet_name, version, df):
+        self.sheet_name = sheet_name
+        self.version = version
+        self.locks = {}
+        # Ordenado pelo carimbo de data/hora para o recorte por período (SheetIndex)
+        if 'Carimbo de data/hora' in df.columns:
+            df = df.sort_values('Carimbo de data/hora', kind='stable', na_position='last', ignore_index=True)
+        self.df = df
+    
+    @shared_property
+    def index(self):
+        """Índice de datas e colaboradores para filter_dataframe"""
+        with timed_stage("indice", aba=self.sheet_name, linhas=len(self.df)):
+            return SheetIndex(self.df)
+    
+    @shared_property
+    def histograms(self):
+        """Histogramas de notas por pergunta, colaborador e dia"""
+        with timed_stage("histogramas", aba=self.sheet_name, linhas=len(self.df)):
+            return ScoreHistograms(self.df, self.index)
+    
+    @shared_property
+    def comments(self):
+        """Comentários das colunas OBSERVAÇÕES* com índice de busca"""
+        with timed_stage("comentarios", aba=self.sheet_name, linhas=len(self.df)):
+            return CommentIndex(self.df)
+    
+    @shared_property
+    def ranking(self):
+        """Ranking de colaboradores da versão (período completo)"""
+        with timed_stage("ranking", aba=self.sheet_name, linhas=len(self.df)):
+            return collaborator_ranking(self.df, categories_for(self.sheet_name))
+
+@process_resource
+def get_processing_cache():
+    """Abas processadas por (aba, versão); duas versões por aba bastam"""
+    return LRUCache(maxsize=2 * len(SHEET_NAMES))
+
+def process_sheet(sheet_name, data):
+    """Processa a cópia publicada de uma aba (falha do cache de processamento)"""
+    with timed_stage("process_dataframe", aba=sheet_name, linhas=len(data.df)):
+        return ProcessedSheet(sheet_name, data.version, process_dataframe(data.df))
+
+def get_processed_sheet(sheet_name, data):
+    """Aba processada para a cópia publicada `data`, processando só na primeira vez"""
+    return get_processing_cache().get_or_compute(
+        (sheet_name, data.version), lambda: process_sheet(sheet_name, data)
+    )
+
+# Resultados do dashboard compartilhados entre sessões
+STATS_CACHE_MAX_ITEMS = 256
+
+@process_resource
+def get_stats_cache():
+    """Estatísticas por (aba, versão, período, colaborador).
+    
+    A versão dos dados faz parte da chave: quando a aba muda, as combinações
+    antigas deixam de ser usadas e saem pelo LRU.
+    """
+    return LRUCache(maxsize=STATS_CACHE_MAX_ITEMS)
+
+def cached_statistics(sheet, view_key):
+    """Filtros e estatísticas de uma combinação de filtros, calculados uma vez por processo"""
+    sheet_name, _, start_date, end_date, selected_colaborador = view_key
+    
+    def compute():
+        with timed_stage("filtros", aba=sheet_name):
+            selection = sheet.histograms.select(start_date, end_date, selected_colaborador)
+        with timed_stage("estatisticas", aba=sheet_name):
+            return compute_statistics(selection, categories_for(sheet_name))
+    
+    return get_stats_cache().get_or_compute(view_key, compute)
+
+def default_view_key(sheet):
+    """Visão inicial da aba (período completo e todos os colaboradores), como os filtros abrem"""
+    index = sheet.index
+    if index.min_date and index.max_date:
+        start_date, end_date = index.min_date, index.max_date
+    else:
+        start_date = end_date = None
+    selected_colaborador = "Todos" if 'COLABORADOR' in sheet.df.columns else None
+    return (sheet.sheet_name, sheet.version, start_date, end_date, selected_colaborador)
+
+def load_processed_sheet(sheet_name):
+    """Carrega e processa uma aba; retorna None se não for possível conectar à planilha"""
+    if load_sheet(sheet_name) is None:
+        return None
+    return get_processed_sheet(sheet_name, get_sheet_states()[sheet_name].data)
+
+def load_all_processed_sheets():
+    """Carrega e processa todas as abas; retorna None se não for possível conectar à planilha"""
+    if not load_data():
+        return None
+    states = get_sheet_states()
+    return {
+        sheet_name: get_processed_sheet(sheet_name, states[sheet_name].data)
+        for sheet_name in SHEET_NAMES
+    }
+
+# Tabela fato em formato longo (todas as abas)
+QUESTION_CATEGORY = {question_id: q.category for question_id, q in QUESTIONS.items()}
+
+FACT_ID_COLUMNS = {
+    'Carimbo de data/hora': 'timestamp',
+    'AVALIADOR': 'evaluator',
+    'COLABORADOR': 'collaborator',
+}
+
+def build_fact_table(sheets):
+    """Uma linha por nota: (sector, timestamp, evaluator, collaborator, question_id, category, score).
+    
+    As abas são empilhadas e convertidas para o formato longo com um único
+    melt; os textos repetidos viram category para que os agrupamentos entre
+    setores trabalhem sobre códigos inteiros.
+    """
+    frames = []
+    for sheet_name, sheet in sheets.items():
+        df = sheet.df
+        if df.empty:
+            continue
+        questions = [col for col in RATING_COLUMNS if col in df.columns]
+        wide = pd.DataFrame({
+            fact_col: df[col] if col in df.columns else None
+            for col, fact_col in FACT_ID_COLUMNS.items()
+        })
+        wide[questions] = df[questions]
+        wide.insert(0, 'sector', sheet_name)
+        frames.append(wide)
+    
+    columns = ['sector', *FACT_ID_COLUMNS.values(), 'question_id', 'category', 'score']
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    
+    wide = pd.concat(frames, ignore_index=True)
+    facts = wide.melt(
+        id_vars=['sector', *FACT_ID_COLUMNS.values()],
+        var_name='question_id',
+        value_name='score',
+    ).dropna(subset=['score'])
+    
+    for col in ['sector', 'evaluator', 'collaborator', 'question_id']:
+        facts[col] = facts[col].astype('category')
+    facts['category'] = facts['question_id'].map(QUESTION_CATEGORY).astype('category')
+    facts['timestamp'] = pd.to_datetime(facts['timestamp'])
+    facts['score'] = facts['score'].astype(RATING_DTYPE)
+    return facts[columns].reset_index(drop=True)
+
+@process_resource
+def get_fact_table_cache():
+    """Tabela fato por combinação de versões das abas (uma por atualização dos dados)"""
+    return LRUCache(maxsize=2)
+
+def load_fact_table():
+    """Tabela fato da versão atual das abas; retorna (versões, tabela) ou None sem conexão"""
+    sheets = load_all_processed_sheets()
+    if sheets is None:
+        return None
+    versions = tuple((name, sheet.version) for name, sheet in sheets.items())
+    
+    def build():
+        with timed_stage("tabela_fato"):
+            return build_fact_table(sheets)
+    
+    facts = get_fact_table_cache().get_or_compute(versions, build)
+    return versions, facts
+
+# Agregados por período para a visão de tendências
+TREND_GRANULARITIES = {"Dia": "D", "Semana": "W", "Mês": "M"}
+
+def rollup_scores(df, freq):
+    """Soma e quantidade de notas por (período, colaborador, pergunta)"""
+    questions = [col for col in RATING_COLUMNS if col in df.columns]
+    if df.empty or not questions or 'Carimbo de data/hora' not in df.columns:
+        return pd.DataFrame(columns=['sum', 'count'])
+    
+    period = df['Carimbo de data/hora'].dt.to_period(freq).dt.start_time.rename('period')
+    colaborador = (
+        df['COLABORADOR'].astype(object) if 'COLABORADOR' in df.columns
+        else pd.Series("", index=df.index)
+    ).rename('collaborator')
+    
+    scores = df[questions].set_index([period, colaborador])
+    scores.columns.name = 'question'
+    stacked = scores.stack()
+    stacked = stacked[stacked.index.get_level_values('period').notna()]
+    return stacked.groupby(level=['period', 'collaborator', 'question']).agg(['sum', 'count'])
+
+class TrendRollups:
+    """Soma e quantidade de notas por período (dia, semana e mês) de uma aba.
+    
+    Mantidos de forma incremental: quando a aba só ganhou linhas novas (mesma
+    geração), apenas essas linhas são processadas e somadas aos agregados.
+    Uma edição em respostas antigas (nova geração) refaz os agregados.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.version = None
+        self.row_count = 0
+        self.tables = {}
+    
+    def update(self, data, processed):
+        """Atualiza os agregados para a cópia publicada `data` da aba"""
+        with self.lock:
+            if self.version == data.version:
+                return self.tables
             
-            # Filtrar apenas valores entre 1 e 10
-            df[col] = df[col].where((df[col] >= 1) & (df[col] <= 10))
+            if self.generation == data.generation and len(data.df) >= self.row_count:
+                new_rows = process_dataframe(data.df.iloc[self.row_count:])
+                for freq, table in self.tables.items():
+                    delta = rollup_scores(new_rows, freq)
+                    self.tables[freq] = table.add(delta, fill_value=0) if len(delta) else table
+            else:
+                self.tables = {
+                    freq: rollup_scores(processed.df, freq)
+                    for freq in TREND_GRANULARITIES.values()
+                }
             
-            # Verificar se a conversão funcionou
-            if df[col].notna().any():
-                numeric_columns.append(col)
-                
-        except Exception as e:
-            # Se não conseguir converter, manter valores originais
-            df[col] = original_values
+            self.generation = data.generation
+            self.version = data.version
+            self.row_count = len(data.df)
+            return self.tables
+
+@process_resource
+def get_trend_rollups():
+    """Agregados de tendência por aba (um conjunto por processo)"""
+    return {sheet_name: TrendRollups() for sheet_name in SHEET_NAMES}
+
+def trend_series(table, categories, selected_colaborador=None, periods=None):
+    """Média por período de cada categoria e a média geral (média das médias das perguntas)"""
+    if table.empty:
+        return pd.DataFrame()
+    
+    if selected_colaborador and selected_colaborador != "Todos":
+        if selected_colaborador not in table.index.get_level_values('collaborator'):
+            return pd.DataFrame()
+        table = table.xs(selected_colaborador, level='collaborator')
+    
+    totals = table.groupby(level=['period', 'question']).sum()
+    question_means = (totals['sum'] / totals['count']).unstack('question')
+    if periods:
+        question_means = question_means.iloc[-periods:]
+    
+    series = {}
+    all_questions = []
+    for name, columns in categories:
+        present = [col for col in columns if col in question_means.columns]
+        all_questions.extend(present)
+        if present:
+            series[name] = question_means[present].mean(axis=1)
+    series["MÉDIA GERAL"] = question_means[all_questions].mean(axis=1)
+    return pd.DataFrame(series)
+
+# Cache de gráficos prontos
+FIGURE_CACHE_MAX_ITEMS = 2000
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+
+def figure_size(fig):
+    """Tamanho do gráfico serializado em JSON (o que é enviado ao navegador)"""
+    return len(pio.to_json(fig, validate=False))
+
+@process_resource
+def get_figure_cache():
+    """Gráficos por (aba, versão, período, colaborador, pergunta), com limite de memória"""
+    return LRUCache(FIGURE_CACHE_MAX_ITEMS, max_bytes=FIGURE_CACHE_MAX_BYTES, sizeof=figure_size)
+
+def cached_figure(key, build):
+    """Reaproveita o gráfico já montado para a mesma chave; sem chave, sempre monta"""
+    def timed_build():
+        with timed_stage("grafico"):
+            return build()
     
-    return df
+    if key is None:
+        return timed_build()
+    return get_figure_cache().get_or_compute(key, timed_build)
+
+def sector_palette(sheet_name):
+    """Paleta dos gráficos de pizza de cada aba"""
+    palettes = {
+        "PRODUÇÃO": px.colors.qualitative.Set2,
+        "ADMINISTRATIVO": px.colors.qualitative.Set1,
+        "COMERCIAL": px.colors.qualitative.Pastel1,
+    }
+    return palettes.get(sheet_name, px.colors.qualitative.Pastel2)  # CLIMA
 
 def create_pie_chart(values, title, full_title, colors=None):
     """Cria gráfico de pizza"""
@@ -344,19 +1819,24 @@ def create_pie_chart(values, title, full_title, colors=None):
         return go.Figure()
     
     # Contar distribuição de notas
-    counts = clean_values.value_counts().sort_index()
+    distribution = np.bincount(score_buckets(clean_values.to_numpy()), minlength=SCORE_BUCKETS)
+    return create_distribution_pie_chart(distribution, title, full_title, colors)
+
+def create_distribution_pie_chart(distribution, title, full_title, colors=None):
+    """Cria gráfico de pizza a partir da contagem de cada nota (array de 10 posições)"""
+    notas = np.flatnonzero(distribution)
     
-    if len(counts) == 0:
+    if len(notas) == 0:
         return go.Figure()
     
     if colors is None:
         colors = px.colors.qualitative.Set3
     
     fig = go.Figure(data=[go.Pie(
-        labels=[f'Nota {int(k)}' for k in counts.index],
-        values=counts.values,
+        labels=[f'Nota {k + 1}' for k in notas],
+        values=distribution[notas],
         hole=0.4,
-        marker_colors=colors[:len(counts)],
+        marker_colors=colors[:len(notas)],
         hovertemplate='<b>%{label}</b><br>Quantidade: %{value}<br>Porcentagem: %{percent}<extra></extra>'
     )])
     
@@ -375,89 +1855,161 @@ def create_pie_chart(values, title, full_title, colors=None):
     return fig
     
 
-def display_category_analysis(df, category_columns, category_name, colors=None):
-    """Exibe análise de uma categoria"""
-    st.markdown(f'<div class="category-header">ANÁLISE - {category_name.upper()}</div>', unsafe_allow_html=True)
+def category_bar_spec(category, title=""):
+    """Barras empilhadas perguntas × notas (1-10) de uma categoria, em percentual.
     
-    # Verificar se as colunas existem no DataFrame
-    existing_columns = [col for col in category_columns if col in df.columns]
+    Usa as mesmas distribuições dos gráficos de pizza em um único gráfico.
+    Devolve a especificação do Plotly como dicionário (None sem respostas):
+    o relatório em lote a converte em HTML sem a validação das classes go.*.
+    """
+    questions = [q for q in category.questions if q.count > 0]
+    if not questions:
+        return None
     
-    if not existing_columns:
-        st.warning(f"Nenhuma coluna encontrada para a categoria {category_name}")
-        st.info("Colunas esperadas:")
-        for col in category_columns[:3]:  # Mostrar apenas as primeiras 3
-            st.write(f"- {col}")
-        if len(category_columns) > 3:
-            st.write(f"... e mais {len(category_columns) - 3} colunas")
-        return
+    labels = [f"{QUESTIONS[q.question].label} ({q.mean:.2f})" for q in questions]
+    distributions = np.array([q.distribution for q in questions], dtype=np.float64)
+    percents = distributions / distributions.sum(axis=1, keepdims=True) * 100
+    note_colors = px.colors.sample_colorscale("RdYlGn", SCORE_BUCKETS)
+    
+    data = [
+        {
+            'type': 'bar',
+            'name': f'Nota {k + 1}',
+            'y': labels,
+            'x': percents[:, k],
+            'customdata': distributions[:, k],
+            'orientation': 'h',
+            'marker': {'color': note_colors[k]},
+            'hovertemplate': '<b>%{y}</b><br>Nota ' + str(k + 1) + ': %{customdata:.0f} (%{x:.1f}%)<extra></extra>',
+        }
+        for k in range(SCORE_BUCKETS)
+    ]
+    layout = {
+        'barmode': 'stack',
+        'title': {'text': title, 'x': 0.5, 'xanchor': 'center', 'font': {'size': 16}},
+        'font': {'size': 12},
+        'height': 120 + 40 * len(questions),
+        'margin': {'t': 60, 'b': 30, 'l': 10, 'r': 10},
+        'xaxis': {'title': {'text': '% das respostas'}, 'range': [0, 100]},
+        'yaxis': {'autorange': 'reversed'},
+        'legend': {'orientation': 'h', 'yanchor': 'bottom', 'y': 1.02, 'xanchor': 'center', 'x': 0.5, 'traceorder': 'normal'},
+    }
+    return {'data': data, 'layout': layout}
+
+def create_category_bar_chart(category, title=""):
+    """Figura do gráfico de barras da categoria (category_bar_spec)"""
+    spec = category_bar_spec(category, title)
+    return go.Figure(spec) if spec else go.Figure()
+
+def display_question_charts(category, colors=None, view_key=None):
+    """Um gráfico de pizza e a média de cada pergunta da categoria"""
+    category_name = category.name
     
     # Criar colunas para os gráficos
-    n_cols = min(4, len(existing_columns))
+    n_cols = min(4, len(category.questions))
     cols = st.columns(n_cols)
     
-    category_means = []
-    
-    for i, col in enumerate(existing_columns):
+    for i, question in enumerate(category.questions):
         col_idx = i % n_cols
+        question_id = question.question
+        col = QUESTIONS[question_id].text.strip()
         
         with cols[col_idx]:
             try:
-                values = df[col].dropna()
-                
-                if len(values) > 0:
-                    # Verificar se são valores numéricos válidos
-                    numeric_values = pd.to_numeric(values, errors='coerce').dropna()
+                if question.count > 0:
+                    mean_val = question.mean
+                    
+                    # Nome curto para o gráfico
+                    short_name = QUESTIONS[question_id].label
+                    
+                    # Limitar nome para exibição
+                    display_name = short_name if len(short_name) <= 20 else short_name[:17] + "..."
                     
-                    if len(numeric_values) > 0:
-                        mean_val = numeric_values.mean()
-                        category_means.append(mean_val)
-                        
-                        # Nome curto para o gráfico
-                        short_name = col.split('(')[0].strip()
-
-                       # Renomear "Faz uso correto dos EPI's" para "Segurança"  
-                        if "EPI" in col:
-                            short_name = "Segurança"
-                        
-                        # Limitar nome para exibição
-                        display_name = short_name if len(short_name) <= 20 else short_name[:17] + "..."
-                        
-                        # Criar container com tooltip para o título
-                        st.markdown(f'''
-                        <div title="{col}" style="text-align: center; margin-bottom: 10px; 
-                             font-weight: bold; font-size: 18px; color: #333; cursor: help;
-                             padding: 5px; border-radius: 5px; background: rgba(150, 202, 0, 0.1);">
-                            {display_name}
-                        </div>
-                        ''', unsafe_allow_html=True)
-                        
-                        fig = create_pie_chart(numeric_values, "", col, colors)  # Título vazio para evitar duplicação
-                        chart_key = f"chart_{category_name}_{i}_{hash(col) % 10000}"
-
-                        if fig:  # Verificar se o gráfico foi criado com sucesso
-                            st.plotly_chart(fig, use_container_width=True, key=chart_key)
-                        else:
-                            st.warning("Erro ao criar gráfico")
-                        
-                        # Métrica abaixo do gráfico - centralizada
-                
-                        st.markdown(f"""
-                        <div class="metric-card" style="text-align: center; margin-bottom: 2rem;">
-                            <div class="metric-value" style="margin: 0 auto;">{mean_val:.2f}</div>
-                            <div class="metric-label" style="margin: 0.2rem auto 0;">Média</div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    # Criar container com tooltip para o título
+                    st.markdown(f'''
+                    <div title="{col}" style="text-align: center; margin-bottom: 10px; 
+                         font-weight: bold; font-size: 18px; color: #333; cursor: help;
+                         padding: 5px; border-radius: 5px; background: rgba(150, 202, 0, 0.1);">
+                        {display_name}
+                    </div>
+                    ''', unsafe_allow_html=True)
+                    
+                    fig = question_figure(question, colors, view_key)
+                    chart_key = f"chart_{category_name}_{question_id}"
+
+                    if fig:  # Verificar se o gráfico foi criado com sucesso
+                        st.plotly_chart(fig, use_container_width=True, key=chart_key)
                     else:
-                        st.warning(f"Sem dados numéricos válidos para: {col[:30]}...")
+                        st.warning("Erro ao criar gráfico")
+                    
+                    # Métrica abaixo do gráfico - centralizada
+            
+                    st.markdown(f"""
+                    <div class="metric-card" style="text-align: center; margin-bottom: 2rem;">
+                        <div class="metric-value" style="margin: 0 auto;">{mean_val:.2f}</div>
+                        <div class="metric-label" style="margin: 0.2rem auto 0;">Média</div>
+                    </div>
+                    """, unsafe_allow_html=True)
                 else:
                     st.warning(f"Sem dados para: {col[:30]}...")
                     
             except Exception as e:
                 st.error(f"Erro ao processar coluna {col[:30]}...: {str(e)}")
+
+def question_figure(question, colors=None, view_key=None):
+    """Gráfico de pizza de uma pergunta, do cache de figuras quando houver view_key"""
+    figure_key = None if view_key is None else view_key + (question.question,)
+    full_title = QUESTIONS[question.question].text.strip()
+    return cached_figure(
+        figure_key,
+        lambda: create_distribution_pie_chart(question.distribution, "", full_title, colors),  # Título vazio para evitar duplicação
+    )
+
+def category_figure(category, view_key=None):
+    """Gráfico de barras empilhadas da categoria (modo compacto)"""
+    figure_key = None if view_key is None else view_key + ("compacto", category.name)
+    return cached_figure(figure_key, lambda: create_category_bar_chart(category))
+
+def display_category_chart(category, view_key=None):
+    """Um único gráfico para a categoria inteira (modo compacto)"""
+    fig = category_figure(category, view_key)
+    st.plotly_chart(fig, use_container_width=True, key=f"chart_{category.name}_compacto")
+
+def display_category_analysis(category, colors=None, view_key=None, compact=False, lazy=False):
+    """Exibe análise de uma categoria a partir das estatísticas já calculadas
+    
+    `view_key` identifica a seleção atual (aba, versão, período e colaborador)
+    e permite reaproveitar os gráficos do cache de figuras. No modo compacto a
+    categoria inteira vira um único gráfico de barras empilhadas. Com `lazy`,
+    os gráficos só são montados e enviados depois que o usuário abre a seção.
+    """
+    category_name = category.name
+    category_columns = category.columns
+    st.markdown(f'<div class="category-header">ANÁLISE - {category_name.upper()}</div>', unsafe_allow_html=True)
+    
+    if not category.questions:
+        st.warning(f"Nenhuma coluna encontrada para a categoria {category_name}")
+        st.info("Colunas esperadas:")
+        for question_id in category_columns[:3]:  # Mostrar apenas as primeiras 3
+            st.write(f"- {QUESTIONS[question_id].text.strip()}")
+        if len(category_columns) > 3:
+            st.write(f"... e mais {len(category_columns) - 3} colunas")
+        return
+    
+    show_charts = not lazy or st.toggle(
+        "📊 Exibir gráficos",
+        key=f"show_charts_{category_name}",
+        help="Os gráficos da categoria só são carregados quando esta opção está ativa."
+    )
+    
+    if show_charts and compact:
+        display_category_chart(category, view_key)
+    elif show_charts:
+        display_question_charts(category, colors, view_key)
     
     # Média da categoria - em maiúsculas
-    if category_means:
-        overall_mean = np.mean(category_means)
+    if not np.isnan(category.mean):
+        overall_mean = category.mean
         st.markdown(f"""
         <div style="background: #e8f5e8; padding: 1rem; border-radius: 8px; margin: 1rem 0; text-align: center;">
             <h3 style="color: #2e7d32; margin: 0;">MÉDIA {category_name.upper()}</h3>
@@ -467,8 +2019,63 @@ def display_category_analysis(df, category_columns, category_name, colors=None):
     else:
         st.warning(f"Não foi possível calcular a média para {category_name}")
 
-def filter_dataframe(df, start_date, end_date, selected_colaborador):
-    """Aplica filtros ao DataFrame"""
+def display_summary(stats, selected_tab):
+    """Média geral e média de cada categoria, exibidas antes dos gráficos"""
+    overall_mean = stats.overall_mean
+    
+    if selected_tab == "CLIMA":
+        # Média geral do clima
+        if not np.isnan(overall_mean):
+            st.markdown(f"""
+            <div style="background: linear-gradient(90deg, #E91E63 0%, #F8BBD9 100%); 
+                        color: white; padding: 1.5rem; border-radius: 10px; 
+                        margin: 2rem 0; text-align: center;">
+                <h2 style="margin: 0;">MÉDIA GERAL DO CLIMA</h2>
+                <h1 style="margin: 0.5rem 0; font-size: 3rem;">{overall_mean:.2f}</h1>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    else:
+        # Média geral
+        if not np.isnan(overall_mean):
+            # Cor do header baseada no setor
+            if selected_tab == "PRODUÇÃO":
+                bg_color = "linear-gradient(90deg, #4CAF50 0%, #8BC34A 100%)"
+            elif selected_tab == "ADMINISTRATIVO":
+                bg_color = "linear-gradient(90deg, #2196F3 0%, #64B5F6 100%)"
+            else:  # COMERCIAL
+                bg_color = "linear-gradient(90deg, #FF9800 0%, #FFB74D 100%)"
+            
+            st.markdown(f"""
+            <div style="background: {bg_color}; 
+                        color: white; padding: 1.5rem; border-radius: 10px; 
+                        margin: 2rem 0; text-align: center;">
+                <h2 style="margin: 0;">MÉDIA GERAL</h2>
+                <h1 style="margin: 0.5rem 0; font-size: 3rem;">{overall_mean:.2f}</h1>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        # Média de cada categoria
+        cols = st.columns(len(stats.categories))
+        for col, category in zip(cols, stats.categories):
+            with col:
+                value = "-" if np.isnan(category.mean) else f"{category.mean:.2f}"
+                st.markdown(f"""
+                <div class="metric-card" style="text-align: center; margin-bottom: 1rem;">
+                    <div class="metric-value" style="margin: 0 auto;">{value}</div>
+                    <div class="metric-label" style="margin: 0.2rem auto 0;">{category.name}</div>
+                </div>
+                """, unsafe_allow_html=True)
+
+def filter_dataframe(df, start_date, end_date, selected_colaborador, index=None):
+    """Aplica filtros ao DataFrame
+    
+    Com o índice da aba (SheetIndex), o período é recortado por busca binária e
+    o colaborador pelas posições pré-calculadas, sem copiar o DataFrame inteiro.
+    """
+    if index is not None:
+        return filter_indexed(df, index, start_date, end_date, selected_colaborador)
+    
     filtered_df = df.copy()
     
     # Filtro por data
@@ -484,8 +2091,449 @@ def filter_dataframe(df, start_date, end_date, selected_colaborador):
     
     return filtered_df
 
+def filter_indexed(df, index, start_date, end_date, selected_colaborador):
+    """Filtro de filter_dataframe usando o índice da aba"""
+    lo, hi = 0, len(df)
+    if 'Data' in df.columns and start_date and end_date:
+        lo, hi = index.date_range(start_date, end_date)
+    
+    if selected_colaborador and selected_colaborador != "Todos" and 'COLABORADOR' in df.columns:
+        positions = index.positions.get(selected_colaborador, np.array([], dtype=np.intp))
+        positions = positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)]
+        return df.iloc[positions]
+    
+    return df.iloc[lo:hi]
+
+def setup_page():
+    """Configuração da página e CSS (reemitidos apenas nas execuções completas)"""
+    # Configuração da página
+    st.set_page_config(
+        page_title="Dashboard RH - Análise de Desempenho",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    # CSS personalizado
+    st.markdown("""
+    <style>
+        @import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;500;600;700;800&display=swap');
+    
+        /* Aplicar Montserrat globalmente */
+        html, body, [class*="css"], h1, h2, h3, h4, h5, h6, p, div, span {
+            font-family: 'Montserrat', sans-serif !important;
+        }
+    
+        /* Personalizar sidebar */
+        .css-1d391kg {
+            background: linear-gradient(180deg, #96CA00 0%, #C5DF56 50%, #84A802 100%) !important;
+            padding: 1rem !important;
+        }
+    
+        .css-1d391kg .stSelectbox label,
+        .css-1d391kg .stDateInput label,
+        .css-1d391kg h2,
+        .css-1d391kg h3 {
+            color: white !important;
+            font-weight: 600 !important;
+            font-family: 'Montserrat', sans-serif !important;
+        }
+    
+        .css-1d391kg .stButton button {
+            background: rgba(255, 255, 255, 0.2) !important;
+            color: white !important;
+            border: 2px solid white !important;
+            border-radius: 8px !important;
+            font-weight: 600 !important;
+            font-family: 'Montserrat', sans-serif !important;
+            transition: all 0.3s ease !important;
+        }
+    
+        .css-1d391kg .stButton button:hover {
+            background: white !important;
+            color: #96CA00 !important;
+        }
+    
+        .css-1d391kg .stMetric {
+            background: rgba(255, 255, 255, 0.15) !important;
+            padding: 1rem !important;
+            border-radius: 8px !important;
+            margin: 0.5rem 0 !important;
+        }
+    
+        .css-1d391kg .stMetric label,
+        .css-1d391kg .stMetric [data-testid="metric-container"] {
+            color: white !important;
+            font-family: 'Montserrat', sans-serif !important;
+            font-weight: 600 !important;
+        }
+    
+        /* Logo na sidebar */
+        .sidebar-logo {
+            text-align: center;
+            margin: 1rem 0 2rem 0;
+            padding: 1rem;
+            background: rgba(255, 255, 255, 0.1);
+            border-radius: 10px;
+        }
+    
+        .main-header {
+            background: linear-gradient(90deg, #96CA00 0%, #C5DF56 50%, #84A802 100%);
+            padding: 1rem;
+            border-radius: 10px;
+            margin-bottom: 2rem;
+            text-align: center;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .main-header h1 {
+            color: white;
+            margin: 0;
+            font-weight: 700;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .section-header-producao {
+            background: linear-gradient(90deg, #4CAF50 0%, #8BC34A 100%);
+            color: white;
+            padding: 0.8rem;
+            border-radius: 8px;
+            margin: 1rem 0;
+            text-align: center;
+            font-weight: 600;
+            font-size: 1.8rem;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .section-header-administrativo {
+            background: linear-gradient(90deg, #2196F3 0%, #64B5F6 100%);
+            color: white;
+            padding: 0.8rem;
+            border-radius: 8px;
+            margin: 1rem 0;
+            text-align: center;
+            font-weight: 600;
+            font-size: 1.8rem;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .section-header-comercial {
+            background: linear-gradient(90deg, #FF9800 0%, #FFB74D 100%);
+            color: white;
+            padding: 0.8rem;
+            border-radius: 8px;
+            margin: 1rem 0;
+            text-align: center;
+            font-weight: 600;
+            font-size: 1.8rem;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .section-header-clima {
+            background: linear-gradient(90deg, #E91E63 0%, #F8BBD9 100%);
+            color: white;
+            padding: 0.8rem;
+            border-radius: 8px;
+            margin: 1rem 0;
+            text-align: center;
+            font-weight: 600;
+            font-size: 1.8rem;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .category-header {
+            background: linear-gradient(90deg, #96CA00 0%, #C5DF56 100%);
+            color: white;
+            padding: 0.6rem;
+            border-radius: 6px;
+            margin: 0.8rem 0;
+            text-align: center;
+            font-weight: 600;
+            font-size: 1.4rem;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .metric-card {
+            background: #f8f9fa;
+            padding: 1rem;
+            border-radius: 8px;
+            border: 1px solid #e9ecef;
+            text-align: center;
+            margin-left: auto;
+            margin-right: auto;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .metric-value {
+            font-size: 2rem;
+            font-weight: 700;
+            color: #96CA00;
+            margin: 0;
+            font-family: 'Montserrat', sans-serif;
+        }
+    
+        .metric-label {
+            font-size: 0.9rem;
+            color: #6c757d;
+            margin-top: 0.2rem;
+            font-family: 'Montserrat', sans-serif;
+            font-weight: 500;
+        }
+    
+        .logo-container {
+            text-align: center;
+            margin-bottom: 2rem;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+
+# Tempo de servidor por interação
+TIMING_HISTORY = 20  # execuções guardadas por tipo
+
+TIMING_LABELS = {
+    "completa": "execução completa",
+    "filtros": "filtros (fragmento)",
+    "seção": "seção (fragmento)",
+    "comparativo": "comparativo (fragmento)",
+    "tendências": "tendências (fragmento)",
+    "ranking": "ranking (fragmento)",
+    "comentários": "comentários (fragmento)",
+}
+
+def record_timing(kind, seconds):
+    """Guarda o tempo de uma execução na sessão e registra no log"""
+    history = st.session_state.setdefault("timings", {}).setdefault(kind, [])
+    history.append(seconds)
+    del history[:-TIMING_HISTORY]
+    log_event("tempo_servidor", tipo=kind, ms=round(seconds * 1000, 1))
+
+@contextmanager
+def timed_run(kind):
+    """Mede uma unidade da página; só registra quando ela é a execução mais externa.
+    
+    Assim o fragmento executado dentro de uma execução completa não é contado
+    duas vezes, e uma reexecução isolada do fragmento aparece com o seu tipo.
+    """
+    outer = st.session_state.get("running_unit")
+    if outer is None:
+        st.session_state["running_unit"] = kind
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if outer is None:
+            st.session_state["running_unit"] = None
+            record_timing(kind, time.perf_counter() - start)
+
+def display_timings():
+    """Média do tempo de servidor das últimas execuções de cada tipo"""
+    timings = st.session_state.get("timings", {})
+    parts = [
+        f"{label}: {np.mean(timings[kind]) * 1000:.0f} ms ({len(timings[kind])}x)"
+        for kind, label in TIMING_LABELS.items()
+        if timings.get(kind)
+    ]
+    cache_stats = get_processing_cache().stats()
+    parts.append(f"cache de processamento: {cache_stats['hits']} acertos / {cache_stats['misses']} falhas")
+    st.caption("⏱️ Tempo médio de servidor por interação — " + " · ".join(parts))
+
+# Aquecimento dos caches na inicialização do servidor
+def warm_sheet(sheet_name, data):
+    """Processa a aba e pré-calcula estatísticas e gráficos da visão inicial"""
+    sheet = get_processed_sheet(sheet_name, data)
+    if sheet.df.empty:
+        return
+    
+    # Atribuição: uma expressão solta seria exibida pela "mágica" do Streamlit
+    _ = sheet.ranking, sheet.comments
+    view_key = default_view_key(sheet)
+    stats = cached_statistics(sheet, view_key)
+    colors = sector_palette(sheet_name)
+    for category in stats.categories:
+        category_figure(category, view_key)
+        for question in category.questions:
+            if question.count > 0:
+                question_figure(question, colors, view_key)
+
+def warm_up():
+    """Carrega todas as abas, processa cada uma e monta a visão inicial de cada setor.
+    
+    Roda em segundo plano: as sessões que chegam durante o aquecimento esperam
+    pelo mesmo cálculo nos caches, sem repeti-lo.
+    """
+    with timed_stage("aquecimento"):
+        try:
+            load_all_sheets()
+        except Exception:
+            # Uma aba inexistente derruba o lote: carregar aba por aba
+            logger.exception("Falha na leitura em lote durante o aquecimento")
+            for sheet_name in SHEET_NAMES:
+                try:
+                    get_sheet_data(sheet_name)
+                except Exception:
+                    logger.exception("Falha ao carregar a aba %s durante o aquecimento", sheet_name)
+        
+        states = get_sheet_states()
+        for sheet_name in SHEET_NAMES:
+            data = states[sheet_name].data
+            if data is None:
+                continue
+            try:
+                warm_sheet(sheet_name, data)
+            except Exception:
+                logger.exception("Falha ao aquecer a aba %s", sheet_name)
+        
+        warm_comparison(states)
+
+def warm_comparison(states):
+    """Tabela fato e visão inicial do comparativo entre setores (com todas as abas carregadas)"""
+    if any(states[sheet_name].data is None for sheet_name in SHEET_NAMES):
+        return
+    try:
+        versions, comparison = load_sector_comparison()
+        if not comparison.empty:
+            compare_sectors(versions, comparison, comparison.min_date, comparison.max_date)
+    except Exception:
+        logger.exception("Falha ao montar a tabela fato durante o aquecimento")
+
+def run_warm_up(resources):
+    """Thread do aquecimento, com os singletons resolvidos na thread do script"""
+    use_worker_resources(resources)
+    warm_up()
+
+@st.cache_resource
+def start_workers():
+    """Inicia o worker de atualização e o aquecimento uma única vez por processo.
+    
+    Roda antes da tela de senha: aqui só são resolvidos os singletons, sem ir à
+    rede; a conexão com a fonte de dados é aberta pelo aquecimento.
+    """
+    resources = worker_resources()
+    get_refresher().start(resources)
+    thread = threading.Thread(target=run_warm_up, args=(resources,), name="cache-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# Painel de depuração (somente administradores)
+def frame_memory(df):
+    """Memória ocupada pelo DataFrame, incluindo o conteúdo das colunas de texto"""
+    return int(df.memory_usage(deep=True).sum())
+
+@st.cache_resource
+def get_frame_size_cache():
+    """Memória de cada DataFrame por (aba, versão, tipo): calculada uma vez por versão"""
+    return LRUCache(maxsize=4 * len(SHEET_NAMES))
+
+def sheet_diagnostics():
+    """Linhas, idade, acertos/falhas e memória de cada aba em memória"""
+    rows = []
+    now = time.time()
+    for sheet_name, state in get_sheet_states().items():
+        data = state.data
+        if data is None:
+            rows.append({"aba": sheet_name, "carregada": False, "acertos": state.hits, "falhas": state.misses})
+            continue
+        
+        size_cache = get_frame_size_cache()
+        processed = get_processing_cache().peek((sheet_name, data.version))
+        rows.append({
+            "aba": sheet_name,
+            "carregada": True,
+            "linhas": len(data.df),
+            "versão": data.version,
+            "idade (s)": round(now - data.fetched_at),
+            "do snapshot": state.from_snapshot,
+            "acertos": state.hits,
+            "falhas": state.misses,
+            "bruto (MB)": size_cache.get_or_compute(
+                (sheet_name, data.version, "bruto"), lambda: frame_memory(data.df)
+            ) / 2**20,
+            "processado (MB)": None if processed is None else size_cache.get_or_compute(
+                (sheet_name, data.version, "processado"), lambda: frame_memory(processed.df)
+            ) / 2**20,
+            "erro": state.last_error,
+        })
+    return rows
+
+def cache_diagnostics():
+    """Acertos, falhas, itens e memória dos caches compartilhados"""
+    caches = {
+        "processamento": get_processing_cache(),
+        "estatísticas": get_stats_cache(),
+        "gráficos": get_figure_cache(),
+        "tabela fato": get_fact_table_cache(),
+        "agregado comparativo": get_sector_comparison_cache(),
+        "comparativo": get_comparison_cache(),
+    }
+    rows = []
+    for name, cache in caches.items():
+        cache_stats = cache.stats()
+        rows.append({
+            "cache": name,
+            "acertos": cache_stats["hits"],
+            "falhas": cache_stats["misses"],
+            "compartilhados": cache_stats["shared"],
+            "itens": cache_stats["size"],
+            "MB": cache_stats["bytes"] / 2**20,
+        })
+    return rows
+
+def is_admin():
+    """Modo administrador (senha `senha_admin` das secrets): libera o painel de depuração"""
+    if st.session_state.get("is_admin"):
+        return True
+    try:
+        admin_password = st.secrets.get("senha_admin")
+    except Exception:
+        admin_password = None
+    if not admin_password:
+        return False
+    
+    with st.sidebar.expander("🔑 Administrador"):
+        password = st.text_input("Senha de administrador:", type="password", key="admin_password_input")
+        if password:
+            if password == admin_password:
+                st.session_state.is_admin = True
+                st.rerun()
+            st.error("❌ Senha incorreta!")
+    return False
+
+def display_debug_panel():
+    """Tempo das etapas, caches e tamanho dos DataFrames na barra lateral"""
+    with st.sidebar.expander("🛠️ Depuração", expanded=False):
+        stages = get_stage_timings().summary()
+        sheets = sheet_diagnostics()
+        caches = cache_diagnostics()
+        
+        st.markdown("**Etapas**")
+        if stages:
+            st.dataframe(pd.DataFrame.from_dict(stages, orient="index").round(1), use_container_width=True)
+        else:
+            st.caption("Nenhuma etapa medida ainda")
+        
+        st.markdown("**Abas**")
+        st.dataframe(pd.DataFrame(sheets).set_index("aba").round(2), use_container_width=True)
+        
+        st.markdown("**Caches**")
+        st.dataframe(pd.DataFrame(caches).set_index("cache").round(2), use_container_width=True)
+        
+        # Fotografia do diagnóstico em uma linha JSON, para comparar com o log de produção
+        if st.button("📝 Registrar no log", use_container_width=True):
+            log_event("diagnostico", etapas=stages, abas=sheets, caches=caches)
+            st.success("Diagnóstico registrado no log")
+
 # Interface principal
 def main():
+    setup_logging()
+    setup_page()
+    start_workers()
+    with timed_run("completa"):
+        render_page()
+    
+    if st.session_state.get("authenticated") and is_admin():
+        display_debug_panel()
+
+def render_page():
     # Verificação de senha
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
@@ -542,6 +2590,7 @@ def main():
         
         if st.button("🚪 Sair", use_container_width=True):
             st.session_state.authenticated = False
+            st.session_state.is_admin = False
             st.rerun()
     
     # Logo e cabeçalho
@@ -558,12 +2607,14 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Carregar dados
-    with st.spinner("Carregando dados..."):
-        data = load_data()
+    # Visão: análise de um setor, tendências ou comparativo entre setores
+    view = st.sidebar.radio(
+        "Visão:",
+        ["Análise por setor", "Tendências", "Ranking de colaboradores", "Comentários", "Comparativo entre setores"]
+    )
     
-    if not data:
-        st.error("Não foi possível carregar os dados. Verifique as credenciais e a conexão.")
+    if view == "Comparativo entre setores":
+        comparison_view()
         return
     
     # Sidebar para filtros
@@ -572,31 +2623,59 @@ def main():
     # Seleção de aba
     selected_tab = st.sidebar.selectbox(
         "Selecione o Setor:",
-        ["PRODUÇÃO", "ADMINISTRATIVO", "COMERCIAL", "CLIMA"]
+        SHEET_NAMES
     )
     
-    # Processar dados da aba selecionada
-    if selected_tab in data and not data[selected_tab].empty:
-        df = process_dataframe(data[selected_tab])
-        
-        # Filtros adicionais
-        if 'Data' in df.columns and df['Data'].notna().any():
-            # Filtrar apenas valores de data válidos (não NaN e não None)
-            valid_dates = df['Data'].dropna()
-            if len(valid_dates) > 0:
-                min_date = valid_dates.min()
-                max_date = valid_dates.max()
-            else:
-                min_date = None
-                max_date = None
-        else:
-            min_date = None
-            max_date = None
+    if view == "Tendências":
+        trend_view(selected_tab)
+        return
+    
+    if view == "Ranking de colaboradores":
+        ranking_view(selected_tab)
+        return
+    
+    if view == "Comentários":
+        comment_view(selected_tab)
+        return
+    
+    # Modo de exibição: compacto desenha um gráfico por categoria em vez de um por pergunta
+    render_mode = st.sidebar.radio(
+        "Modo de exibição:",
+        ["Detalhado", "Compacto"],
+        help="O modo compacto mostra cada categoria em um único gráfico, mais leve para o navegador."
+    )
+    
+    dashboard_view(selected_tab, render_mode == "Compacto")
+
+@st.fragment
+def dashboard_view(selected_tab, compact):
+    """Filtros e análise da aba: mudar um filtro reexecuta só este trecho da página"""
+    with timed_run("filtros"):
+        # Carregar apenas a aba selecionada
+        with st.spinner("Carregando dados..."):
+            sheet = load_processed_sheet(selected_tab)
+        
+        if sheet is None:
+            st.error("Não foi possível carregar os dados. Verifique as credenciais e a conexão.")
+            return
+        
+        if sheet.df.empty:
+            st.warning(f"Nenhum dado encontrado para a aba {selected_tab}")
+            return
+        
+        df = sheet.df
+        
+        # Filtros adicionais (limites de data e colaboradores vêm do índice da aba)
+        index = sheet.index
+        min_date = index.min_date
+        max_date = index.max_date
+        
+        col_start, col_end, col_colaborador, col_total = st.columns([1, 1, 2, 1])
         
         # Só mostrar filtros de data se houver datas válidas
         if min_date and max_date:
             
-            start_date = st.sidebar.date_input(
+            start_date = col_start.date_input(
                 "Data inicial:",
                 value=min_date,
                 min_value=min_date,
@@ -604,7 +2683,7 @@ def main():
                 format="DD/MM/YYYY"
             )
             
-            end_date = st.sidebar.date_input(
+            end_date = col_end.date_input(
                 "Data final:",
                 value=max_date,
                 min_value=min_date,
@@ -617,100 +2696,431 @@ def main():
         
         # Filtro por colaborador
         if 'COLABORADOR' in df.columns:
-            colaboradores = ["Todos"] + sorted(df['COLABORADOR'].dropna().unique().tolist())
-            selected_colaborador = st.sidebar.selectbox(
+            colaboradores = ["Todos"] + index.colaboradores
+            selected_colaborador = col_colaborador.selectbox(
                 "Colaborador:",
                 colaboradores
             )
         else:
             selected_colaborador = None
         
-        # Aplicar filtros
-        filtered_df = filter_dataframe(df, start_date, end_date, selected_colaborador)
+        # Aplicar filtros e calcular todas as estatísticas da seleção (compartilhadas entre sessões)
+        view_key = (selected_tab, sheet.version, start_date, end_date, selected_colaborador)
+        stats = cached_statistics(sheet, view_key)
         
         # Exibir informações da seleção
-        st.sidebar.markdown("---")
-        st.sidebar.metric("Total de Avaliações", len(filtered_df))
+        col_total.metric("Total de Avaliações", stats.rows)
         
-        if not filtered_df.empty:
+        if stats.rows > 0:
             # Cabeçalho da seção
             if selected_tab == "PRODUÇÃO":
                 st.markdown('<div class="section-header-producao">ANÁLISE DE DESEMPENHO - PRODUÇÃO</div>', unsafe_allow_html=True)
-                colors = px.colors.qualitative.Set2
             elif selected_tab == "ADMINISTRATIVO":
                 st.markdown('<div class="section-header-administrativo">ANÁLISE DE DESEMPENHO - ADMINISTRATIVO</div>', unsafe_allow_html=True)
-                colors = px.colors.qualitative.Set1
             elif selected_tab == "COMERCIAL":
                 st.markdown('<div class="section-header-comercial">ANÁLISE DE DESEMPENHO - COMERCIAL</div>', unsafe_allow_html=True)
-                colors = px.colors.qualitative.Pastel1
             else:  # CLIMA
                 st.markdown('<div class="section-header-clima">PESQUISA DE CLIMA ORGANIZACIONAL</div>', unsafe_allow_html=True)
-                colors = px.colors.qualitative.Pastel2
+            colors = sector_palette(selected_tab)
             
-            if selected_tab == "CLIMA":
-                # Análise do Clima Organizacional
-                display_category_analysis(filtered_df, CLIMA_ORGANIZACIONAL, "CLIMA ORGANIZACIONAL", colors)
-                
-                # Média geral do clima
-                all_means = []
-                for col in CLIMA_ORGANIZACIONAL:
-                    if col in filtered_df.columns:
-                        values = filtered_df[col].dropna()
-                        if len(values) > 0:
-                            all_means.append(values.mean())
-                
-                if all_means:
-                    overall_mean = np.mean(all_means)
-                    st.markdown(f"""
-                    <div style="background: linear-gradient(90deg, #E91E63 0%, #F8BBD9 100%); 
-                                color: white; padding: 1.5rem; border-radius: 10px; 
-                                margin: 2rem 0; text-align: center;">
-                        <h2 style="margin: 0;">MÉDIA GERAL DO CLIMA</h2>
-                        <h1 style="margin: 0.5rem 0; font-size: 3rem;">{overall_mean:.2f}</h1>
-                    </div>
-                    """, unsafe_allow_html=True)
+            # Resumo primeiro; os gráficos de cada categoria só são montados quando abertos
+            display_summary(stats, selected_tab)
             
-            else:
-                # Análise das três categorias para setores produtivos
-                display_category_analysis(filtered_df, ASPECTOS_PESSOAIS, "ASPECTOS PESSOAIS", colors)
-                display_category_analysis(filtered_df, DESENVOLVIMENTO, "DESENVOLVIMENTO", colors)
-                display_category_analysis(filtered_df, DESEMPENHO_PROFISSIONAL, "DESEMPENHO PROFISSIONAL", colors)
-                
-                # Média geral
-                all_categories = ASPECTOS_PESSOAIS + DESENVOLVIMENTO + DESEMPENHO_PROFISSIONAL
-                all_means = []
-                
-                for col in all_categories:
-                    if col in filtered_df.columns:
-                        values = filtered_df[col].dropna()
-                        if len(values) > 0:
-                            all_means.append(values.mean())
-                
-                if all_means:
-                    overall_mean = np.mean(all_means)
-                    
-                    # Cor do header baseada no setor
-                    if selected_tab == "PRODUÇÃO":
-                        bg_color = "linear-gradient(90deg, #4CAF50 0%, #8BC34A 100%)"
-                    elif selected_tab == "ADMINISTRATIVO":
-                        bg_color = "linear-gradient(90deg, #2196F3 0%, #64B5F6 100%)"
-                    else:  # COMERCIAL
-                        bg_color = "linear-gradient(90deg, #FF9800 0%, #FFB74D 100%)"
-                    
-                    st.markdown(f"""
-                    <div style="background: {bg_color}; 
-                                color: white; padding: 1.5rem; border-radius: 10px; 
-                                margin: 2rem 0; text-align: center;">
-                        <h2 style="margin: 0;">MÉDIA GERAL</h2>
-                        <h1 style="margin: 0.5rem 0; font-size: 3rem;">{overall_mean:.2f}</h1>
-                    </div>
-                    """, unsafe_allow_html=True)
+            for category in stats.categories:
+                category_section(category, colors, view_key, compact)
         
         else:
             st.warning("Nenhum dado encontrado com os filtros aplicados.")
+        
+        display_timings()
+
+@st.fragment
+def category_section(category, colors, view_key, compact):
+    """Seção de uma categoria: abrir ou fechar os gráficos reexecuta só a seção"""
+    with timed_run("seção"):
+        display_category_analysis(category, colors, view_key, compact=compact, lazy=True)
+
+# Comparativo entre setores
+COMPARISON_SECTORS = ["PRODUÇÃO", "ADMINISTRATIVO", "COMERCIAL"]
+
+SECTOR_COLORS = {
+    "PRODUÇÃO": "#4CAF50",
+    "ADMINISTRATIVO": "#2196F3",
+    "COMERCIAL": "#FF9800",
+    "CLIMA": "#E91E63",
+}
+
+class SectorComparison:
+    """Somas e contagens das notas por (setor, pergunta, dia) dos setores comparados.
     
-    else:
-        st.warning(f"Nenhum dado encontrado para a aba {selected_tab}")
+    Montado uma vez por versão das abas a partir da tabela fato; qualquer
+    período é respondido somando os dias selecionados dessa tabela pequena,
+    sem voltar às milhões de linhas da tabela fato.
+    """
+    
+    def __init__(self, facts):
+        facts = facts[facts['sector'].isin(COMPARISON_SECTORS)]
+        self.empty = facts.empty
+        
+        day = facts['timestamp'].dt.floor('D').rename('day')
+        daily = facts.groupby(
+            [facts['sector'], facts['question_id'], day], observed=True, dropna=False
+        )['score'].agg(['sum', 'count'])
+        self.daily = daily.reset_index().sort_values('day', kind='stable', ignore_index=True)
+        
+        days = self.daily['day'].dropna()
+        self.min_date = days.min().date() if len(days) else None
+        self.max_date = days.max().date() if len(days) else None
+    
+    def compare(self, start_date=None, end_date=None):
+        """Média de cada categoria por setor (média das médias das perguntas, como no dashboard)"""
+        daily = self.daily
+        if start_date and end_date:
+            daily = daily[
+                (daily['day'] >= pd.Timestamp(start_date)) & (daily['day'] <= pd.Timestamp(end_date))
+            ]
+        
+        totals = daily.groupby(['sector', 'question_id'], observed=True)[['sum', 'count']].sum()
+        totals = totals[totals['count'] > 0]
+        question_means = (totals['sum'] / totals['count']).rename('score').reset_index()
+        question_means['category'] = question_means['question_id'].astype(str).map(QUESTION_CATEGORY)
+        
+        category_means = (
+            question_means.groupby(['category', 'sector'], observed=True)['score'].mean().unstack('sector')
+        )
+        overall = question_means.groupby('sector', observed=True)['score'].mean()
+        
+        table = category_means.reindex(
+            index=[name for name, _ in SECTOR_CATEGORIES],
+            columns=[sector for sector in COMPARISON_SECTORS if sector in overall.index],
+        )
+        table.loc['MÉDIA GERAL'] = overall
+        return table
+
+@process_resource
+def get_sector_comparison_cache():
+    """Agregado do comparativo por combinação de versões das abas"""
+    return LRUCache(maxsize=2)
+
+@process_resource
+def get_comparison_cache():
+    """Tabelas do comparativo por (versões, período), compartilhadas entre sessões"""
+    return LRUCache(maxsize=64)
+
+def load_sector_comparison():
+    """Agregado do comparativo da versão atual das abas; retorna (versões, agregado) ou None"""
+    result = load_fact_table()
+    if result is None:
+        return None
+    versions, facts = result
+    
+    def build():
+        with timed_stage("agregado_comparativo"):
+            return SectorComparison(facts)
+    
+    return versions, get_sector_comparison_cache().get_or_compute(versions, build)
+
+def compare_sectors(versions, comparison, start_date=None, end_date=None):
+    """Tabela do comparativo para o período, calculada uma vez por (versões, período)"""
+    def compute():
+        with timed_stage("tabela_comparativo"):
+            return comparison.compare(start_date, end_date)
+    
+    return get_comparison_cache().get_or_compute((versions, start_date, end_date), compute)
+
+def create_comparison_chart(table):
+    """Barras agrupadas: média de cada categoria por setor"""
+    fig = go.Figure()
+    for sector in table.columns:
+        fig.add_trace(go.Bar(
+            name=sector,
+            x=table.index,
+            y=table[sector],
+            marker_color=SECTOR_COLORS.get(sector),
+            text=[f"{v:.2f}" if pd.notna(v) else "" for v in table[sector]],
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>' + sector + ': %{y:.2f}<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        barmode='group',
+        font=dict(size=12),
+        height=450,
+        margin=dict(t=40, b=30, l=10, r=10),
+        yaxis=dict(title='Média', range=[0, 10.5]),
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5)
+    )
+    
+    return fig
+
+@st.fragment
+def comparison_view():
+    """Comparativo entre PRODUÇÃO, ADMINISTRATIVO e COMERCIAL"""
+    with timed_run("comparativo"):
+        with st.spinner("Carregando dados..."):
+            result = load_sector_comparison()
+        
+        if result is None:
+            st.error("Não foi possível carregar os dados. Verifique as credenciais e a conexão.")
+            return
+        
+        versions, comparison = result
+        if comparison.empty:
+            st.warning("Nenhum dado encontrado para comparar os setores.")
+            return
+        
+        st.markdown('<div class="category-header">COMPARATIVO ENTRE SETORES</div>', unsafe_allow_html=True)
+        
+        # Limites de data calculados uma vez por versão, junto com o agregado
+        min_date, max_date = comparison.min_date, comparison.max_date
+        if min_date and max_date:
+            col_start, col_end = st.columns(2)
+            start_date = col_start.date_input(
+                "Data inicial:", value=min_date, min_value=min_date, max_value=max_date,
+                format="DD/MM/YYYY", key="comparison_start"
+            )
+            end_date = col_end.date_input(
+                "Data final:", value=max_date, min_value=min_date, max_value=max_date,
+                format="DD/MM/YYYY", key="comparison_end"
+            )
+        else:
+            start_date = end_date = None
+        
+        table = compare_sectors(versions, comparison, start_date, end_date)
+        if table.empty or table.isna().all().all():
+            st.warning("Nenhum dado encontrado com os filtros aplicados.")
+            return
+        
+        fig = cached_figure(
+            (versions, "comparativo", start_date, end_date),
+            lambda: create_comparison_chart(table),
+        )
+        st.plotly_chart(fig, use_container_width=True, key="chart_comparativo")
+        
+        st.dataframe(table.style.format("{:.2f}", na_rep="-"), use_container_width=True)
+        
+        display_timings()
+
+# Tendências ao longo do tempo
+def create_trend_chart(series, colors=None):
+    """Linha da média de cada categoria por período, com a média geral em destaque"""
+    if colors is None:
+        colors = px.colors.qualitative.Set2
+    
+    fig = go.Figure()
+    for i, name in enumerate(series.columns):
+        overall = name == "MÉDIA GERAL"
+        fig.add_trace(go.Scatter(
+            name=name,
+            x=series.index,
+            y=series[name],
+            mode='lines+markers',
+            line=dict(width=4 if overall else 2, color='#333' if overall else colors[i % len(colors)]),
+            hovertemplate='<b>' + name + '</b><br>%{x|%d/%m/%Y}: %{y:.2f}<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        font=dict(size=12),
+        height=450,
+        margin=dict(t=40, b=30, l=10, r=10),
+        yaxis=dict(title='Média', range=[0, 10.5]),
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5)
+    )
+    
+    return fig
+
+@st.fragment
+def trend_view(selected_tab):
+    """Evolução das médias de um setor ou colaborador por dia, semana ou mês"""
+    with timed_run("tendências"):
+        with st.spinner("Carregando dados..."):
+            loaded = load_sheet(selected_tab)
+        
+        if loaded is None:
+            st.error("Não foi possível carregar os dados. Verifique as credenciais e a conexão.")
+            return
+        
+        data = get_sheet_states()[selected_tab].data
+        sheet = get_processed_sheet(selected_tab, data)
+        if sheet.df.empty:
+            st.warning(f"Nenhum dado encontrado para a aba {selected_tab}")
+            return
+        
+        st.markdown(f'<div class="category-header">TENDÊNCIAS - {selected_tab}</div>', unsafe_allow_html=True)
+        
+        col_granularity, col_colaborador, col_periods = st.columns([2, 2, 1])
+        granularity = col_granularity.radio(
+            "Agrupar por:", list(TREND_GRANULARITIES), index=2, horizontal=True, key="trend_granularity"
+        )
+        selected_colaborador = col_colaborador.selectbox(
+            "Colaborador:", ["Todos"] + sheet.index.colaboradores, key="trend_colaborador"
+        )
+        periods = col_periods.number_input(
+            "Últimos períodos:", min_value=1, max_value=366, value=12, key="trend_periods"
+        )
+        
+        freq = TREND_GRANULARITIES[granularity]
+        tables = get_trend_rollups()[selected_tab].update(data, sheet)
+        series = trend_series(tables[freq], categories_for(selected_tab), selected_colaborador, periods)
+        
+        if series.empty or series.isna().all().all():
+            st.warning("Nenhum dado encontrado com os filtros aplicados.")
+            return
+        
+        fig = cached_figure(
+            (selected_tab, sheet.version, "tendência", freq, selected_colaborador, periods),
+            lambda: create_trend_chart(series),
+        )
+        st.plotly_chart(fig, use_container_width=True, key="chart_tendencia")
+        
+        display_timings()
+
+@st.fragment
+def ranking_view(selected_tab):
+    """Ranking de todos os colaboradores da aba, com filtros por faixa, nome e avaliações"""
+    with timed_run("ranking"):
+        with st.spinner("Carregando dados..."):
+            sheet = load_processed_sheet(selected_tab)
+        
+        if sheet is None:
+            st.error("Não foi possível carregar os dados. Verifique as credenciais e a conexão.")
+            return
+        
+        ranking = sheet.ranking
+        if ranking.empty:
+            st.warning(f"Nenhum colaborador avaliado na aba {selected_tab}")
+            return
+        
+        st.markdown(f'<div class="category-header">RANKING DE COLABORADORES - {selected_tab}</div>', unsafe_allow_html=True)
+        
+        col_search, col_bands, col_minimum = st.columns([2, 3, 1])
+        search = col_search.text_input("Buscar colaborador:", key="ranking_search")
+        bands = col_bands.multiselect("Faixas de percentil:", RANKING_BANDS, key="ranking_bands")
+        minimum = col_minimum.number_input(
+            "Mínimo de avaliações:", min_value=1, value=1, key="ranking_minimum"
+        )
+        
+        mask = ranking['Avaliações'] >= minimum
+        if bands:
+            mask &= ranking['Faixa'].isin(bands)
+        if search:
+            mask &= ranking['Colaborador'].str.contains(search, case=False, regex=False)
+        shown = ranking[mask]
+        
+        st.caption(f"{len(shown)} de {len(ranking)} colaboradores · clique no cabeçalho de uma coluna para ordenar")
+        
+        score_columns = [name for name, _ in categories_for(selected_tab)] + ['Média geral']
+        st.dataframe(
+            shown,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                **{col: st.column_config.NumberColumn(format="%.2f") for col in score_columns},
+                'Percentil': st.column_config.ProgressColumn(format="%.0f", min_value=0, max_value=100),
+            },
+        )
+        
+        st.download_button(
+            "⬇️ Baixar CSV",
+            shown.to_csv(index=False).encode("utf-8-sig"),
+            file_name=f"ranking_{sheet_slug(selected_tab)}.csv",
+            mime="text/csv",
+        )
+        
+        display_timings()
+
+COMMENTS_PAGE_SIZE = 20
+
+def display_comment(df, comments, entry, column_names):
+    """Cartão de um comentário com data, colaborador, avaliador e coluna de origem"""
+    row = df.iloc[comments.rows[entry]]
+    timestamp = row.get('Carimbo de data/hora')
+    details = [
+        timestamp.strftime("%d/%m/%Y") if pd.notna(timestamp) else "sem data",
+        row.get('COLABORADOR'),
+        f"avaliador: {row.get('AVALIADOR')}" if pd.notna(row.get('AVALIADOR')) else None,
+        column_names[comments.columns[entry]],
+    ]
+    details = " · ".join(html.escape(str(d)) for d in details if d is not None and pd.notna(d))
+    st.markdown(f"""
+    <div style="padding: 0.8rem 1rem; margin-bottom: 0.8rem; border-radius: 8px;
+                background: rgba(150, 202, 0, 0.08); border-left: 4px solid #96CA00;">
+        <div style="font-size: 0.8rem; color: #666; margin-bottom: 0.3rem;">{details}</div>
+        <div style="white-space: pre-wrap;">{html.escape(comments.texts[entry])}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+@st.fragment
+def comment_view(selected_tab):
+    """Comentários livres da aba, com busca por palavras e paginação no servidor"""
+    with timed_run("comentários"):
+        with st.spinner("Carregando dados..."):
+            sheet = load_processed_sheet(selected_tab)
+        
+        if sheet is None:
+            st.error("Não foi possível carregar os dados. Verifique as credenciais e a conexão.")
+            return
+        
+        comments = sheet.comments
+        if len(comments) == 0:
+            st.warning(f"Nenhum comentário encontrado na aba {selected_tab}")
+            return
+        
+        st.markdown(f'<div class="category-header">COMENTÁRIOS - {selected_tab}</div>', unsafe_allow_html=True)
+        
+        df = sheet.df
+        index = sheet.index
+        col_start, col_end, col_colaborador = st.columns([1, 1, 2])
+        if index.min_date and index.max_date:
+            start_date = col_start.date_input(
+                "Data inicial:", value=index.min_date, min_value=index.min_date,
+                max_value=index.max_date, format="DD/MM/YYYY", key="comments_start"
+            )
+            end_date = col_end.date_input(
+                "Data final:", value=index.max_date, min_value=index.min_date,
+                max_value=index.max_date, format="DD/MM/YYYY", key="comments_end"
+            )
+            row_range = index.date_range(start_date, end_date)
+        else:
+            start_date = end_date = row_range = None
+        
+        if 'COLABORADOR' in df.columns:
+            selected_colaborador = col_colaborador.selectbox(
+                "Colaborador:", ["Todos"] + index.colaboradores, key="comments_colaborador"
+            )
+        else:
+            selected_colaborador = None
+        row_positions = None
+        if selected_colaborador and selected_colaborador != "Todos":
+            row_positions = index.positions.get(selected_colaborador, np.array([], dtype=np.intp))
+        
+        query = st.text_input("Buscar palavras:", key="comments_query", placeholder="ex.: pontualidade equipe")
+        
+        # Mais recentes primeiro
+        entries = comments.search(query, row_range, row_positions)[::-1]
+        
+        # Nova busca ou filtro volta para a primeira página
+        filters = (selected_tab, sheet.version, start_date, end_date, selected_colaborador, query)
+        if st.session_state.get("comments_filters") != filters:
+            st.session_state["comments_filters"] = filters
+            st.session_state["comments_page"] = 1
+        
+        n_pages = max(1, -(-len(entries) // COMMENTS_PAGE_SIZE))
+        st.session_state["comments_page"] = min(st.session_state.get("comments_page", 1), n_pages)
+        
+        col_count, col_page = st.columns([3, 1])
+        page = col_page.number_input("Página:", min_value=1, max_value=n_pages, key="comments_page")
+        col_count.caption(f"{len(entries)} comentários · página {page} de {n_pages}")
+        
+        if len(entries) == 0:
+            st.warning("Nenhum comentário encontrado com os filtros aplicados.")
+        
+        # Só os comentários da página são enviados ao navegador
+        column_names = {position: name.strip() for position, name in comments.column_names.items()}
+        for entry in entries[(page - 1) * COMMENTS_PAGE_SIZE:page * COMMENTS_PAGE_SIZE]:
+            display_comment(df, comments, entry, column_names)
+        
+        display_timings()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file